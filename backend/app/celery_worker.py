@@ -7,10 +7,24 @@ CELERY_RESULT_BACKEND = CELERY_BROKER_URL
 celery_app = Celery(
     "ampflux",
     broker=CELERY_BROKER_URL,
-    backend=CELERY_RESULT_BACKEND
+    backend=CELERY_RESULT_BACKEND,
+    include=["app.tasks.simulation", "app.tasks.contingency", "app.tasks.maintenance"],
 )
 
+# Contingency analysis runs its own process pool, so its queue needs a worker
+# that is not a daemonic prefork child, e.g.:
+#   celery -A app.celery_worker worker -Q contingency -P solo
 celery_app.conf.task_routes = {
+    "app.tasks.contingency.*": {"queue": "contingency"},
     "app.tasks.*": {"queue": "default"},
 }
 
+
+# Reclaim slots of lost tasks and dispatch queued jobs even without new traffic:
+#   celery -A app.celery_worker beat
+celery_app.conf.beat_schedule = {
+    "pump-scheduler": {
+        "task": "app.tasks.maintenance.pump_scheduler",
+        "schedule": float(os.getenv("SCHEDULER_REAP_INTERVAL", "60")),
+    },
+}
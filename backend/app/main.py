@@ -1,6 +1,7 @@
-from fastapi import FastAPI
+from fastapi import FastAPI, Request
 from fastapi.middleware.cors import CORSMiddleware
 from app.routers import auth, users, projects, circuits, ai
+from app.utils.db_routing import mark_write, replica_router, WRITE_METHODS
 
 app = FastAPI()
 
@@ -13,6 +14,14 @@ app.add_middleware(
     allow_headers=["*"],
 )
 
+# Successful writes pin the user to the primary for read-your-writes
+@app.middleware("http")
+async def track_writes(request: Request, call_next):
+    response = await call_next(request)
+    if request.method in WRITE_METHODS and response.status_code < 400:
+        mark_write(request)
+    return response
+
 app.include_router(auth.router, prefix="/auth", tags=["auth"])
 app.include_router(users.router, prefix="/users", tags=["users"])
 app.include_router(projects.router, prefix="/projects", tags=["projects"])
@@ -22,3 +31,7 @@ app.include_router(ai.router, prefix="/ai", tags=["ai"])
 @app.get("/")
 def read_root():
     return {"message": "AmpFlux Backend API is running"}
+
+@app.get("/health/replicas")
+def replica_health():
+    return {"replicas": replica_router.status()}
@@ -52,7 +52,7 @@ class Project(Base):
     __tablename__ = "projects"
     id = Column(Integer, primary_key=True, index=True)
     name = Column(String, nullable=False)
-    company_id = Column(Integer, ForeignKey("companies.id"), nullable=False)
+    company_id = Column(Integer, ForeignKey("companies.id"), nullable=False, index=True)
     owner_id = Column(Integer, ForeignKey("users.id"), nullable=False)
     created_at = Column(DateTime, default=datetime.utcnow)
     updated_at = Column(DateTime, default=datetime.utcnow, onupdate=datetime.utcnow)
@@ -62,6 +62,18 @@ class Project(Base):
     circuit_versions = relationship("CircuitVersion", back_populates="project")
     simulations = relationship("Simulation", back_populates="project")
     audit_logs = relationship("AuditLog", back_populates="project")
+    stats = relationship("ProjectStats", back_populates="project", uselist=False)
+
+class ProjectStats(Base):
+    # Maintained incrementally in the same transaction as each version/simulation write
+    __tablename__ = "project_stats"
+    project_id = Column(Integer, ForeignKey("projects.id"), primary_key=True)
+    version_count = Column(Integer, nullable=False, default=0)
+    simulation_count = Column(Integer, nullable=False, default=0)
+    last_activity_at = Column(DateTime, nullable=True)
+    latest_simulation_id = Column(Integer, nullable=True)
+    latest_result_status = Column(String, nullable=True)
+    project = relationship("Project", back_populates="stats")
 
 class ProjectMember(Base):
     __tablename__ = "project_members"
@@ -1,7 +1,12 @@
-from fastapi import APIRouter, Depends
+from fastapi import APIRouter, Depends, HTTPException
+from sqlalchemy.orm import Session
+from app.database import SessionLocal
+from app import models
 from app.utils.security import get_current_user
+from app.utils import ai as ai_utils
 from app.utils.ai import ask_gpt
-from pydantic import BaseModel
+from app.utils.ai_context import build_context, load_circuit_data, estimate_tokens, DEFAULT_CONTEXT_TOKENS, MAX_CONTEXT_TOKENS
+from pydantic import BaseModel, Field
 from typing import Optional
 
 router = APIRouter()
@@ -11,18 +16,38 @@ class AIRequest(BaseModel):
     project_context: Optional[str] = None
     components: Optional[list] = None
     simulation_results: Optional[dict] = None
+    project_id: Optional[int] = None
+    max_context_tokens: int = Field(DEFAULT_CONTEXT_TOKENS, ge=0, le=MAX_CONTEXT_TOKENS)
+
+def get_db():
+    db = SessionLocal()
+    try:
+        yield db
+    finally:
+        db.close()
 
 @router.post("/assistant", response_model=dict)
-def ai_assistant(request: AIRequest, current_user=Depends(get_current_user)):
-    # Compose prompt with context
-    context = ""
-    if request.project_context:
-        context += f"Project context: {request.project_context}\n"
-    if request.components:
-        context += f"Available components: {request.components}\n"
-    if request.simulation_results:
-        context += f"Simulation results: {request.simulation_results}\n"
-    full_prompt = context + request.prompt
-    answer = ask_gpt(full_prompt)
-    return {"answer": answer}
+def ai_assistant(request: AIRequest, db: Session = Depends(get_db), current_user=Depends(get_current_user)):
+    # Pull the latest saved circuit server-side instead of the client resending it
+    circuit_data = None
+    if request.project_id is not None:
+        member = db.query(models.ProjectMember).filter_by(project_id=request.project_id, user_id=current_user.id).first()
+        if not member:
+            raise HTTPException(status_code=403, detail="Not a project member")
+        circuit_data = load_circuit_data(db, request.project_id)
+    # Compose prompt with context fitted to the token budget
+    context = build_context(
+        project_context=request.project_context,
+        components=request.components,
+        simulation_results=request.simulation_results,
+        circuit_data=circuit_data,
+        max_tokens=request.max_context_tokens,
+    )
+    answer = ask_gpt(request.prompt, company_id=current_user.company_id, context=context)
+    return {"answer": answer, "context_tokens": estimate_tokens(context)}
 
+@router.get("/cache_stats", response_model=dict)
+def ai_cache_stats(current_user=Depends(get_current_user)):
+    if ai_utils.semantic_cache is None:
+        return {"enabled": False}
+    return {"enabled": True, **ai_utils.semantic_cache.stats(current_user.company_id)}
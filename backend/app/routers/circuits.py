@@ -1,14 +1,21 @@
-from fastapi import APIRouter, Depends, HTTPException
+from fastapi import APIRouter, Depends, HTTPException, UploadFile, File, Form
 from sqlalchemy.orm import Session
 from app.database import SessionLocal
 from app import models
+from app.utils.db_routing import get_read_db
 from app.utils.security import get_current_user
-from typing import List, Any
+from typing import List, Any, Optional
 from datetime import datetime
 import numpy as np
 from app.tasks.simulation import run_short_circuit_simulation
+from app.tasks.contingency import run_contingency_analysis, CONTINGENCY_TASK_TIMEOUT
 from celery.result import AsyncResult
 from app.celery_worker import celery_app
+from app.utils.netlist_import import import_netlist, NetlistImportError
+from app.utils.blob_store import offload_json, read_json_range, list_counts
+from app.utils.scheduling import scheduler, get_plan_limits, AdmissionError
+from app.utils import project_stats
+import uuid
 from pydantic import BaseModel
 
 router = APIRouter()
@@ -16,6 +23,9 @@ router = APIRouter()
 class CircuitSimulationRequest(BaseModel):
     circuit_data: str
 
+class ContingencyRequest(BaseModel):
+    version_id: Optional[int] = None
+
 def get_db():
     db = SessionLocal()
     try:
@@ -29,14 +39,33 @@ def save_circuit_version(project_id: int, data_json: Any, db: Session = Depends(
     member = db.query(models.ProjectMember).filter_by(project_id=project_id, user_id=current_user.id).first()
     if not member:
         raise HTTPException(status_code=403, detail="Not a project member")
-    version = models.CircuitVersion(project_id=project_id, data_json=data_json)
+    version = models.CircuitVersion(project_id=project_id, data_json=offload_json(f"projects/{project_id}/versions/{uuid.uuid4().hex}", data_json))
     db.add(version)
+    project_stats.record_version(db, project_id)
     db.commit()
     db.refresh(version)
     return {"id": version.id, "created_at": version.created_at}
 
+@router.post("/{project_id}/import", response_model=dict)
+def import_circuit_version(project_id: int, format: str = Form(...), files: List[UploadFile] = File(...), db: Session = Depends(get_db), current_user: models.User = Depends(get_current_user)):
+    member = db.query(models.ProjectMember).filter_by(project_id=project_id, user_id=current_user.id).first()
+    if not member:
+        raise HTTPException(status_code=403, detail="Not a project member")
+    # Uploads are parsed line by line straight from the spooled files, and
+    # large ones are paged into the blob store while parsing
+    try:
+        data_json = import_netlist(format, [(f.filename or "", f.file) for f in files], f"projects/{project_id}/versions/{uuid.uuid4().hex}")
+    except NetlistImportError as e:
+        raise HTTPException(status_code=422, detail={"message": str(e), "errors": e.errors})
+    version = models.CircuitVersion(project_id=project_id, data_json=data_json)
+    db.add(version)
+    project_stats.record_version(db, project_id)
+    db.commit()
+    db.refresh(version)
+    return {"id": version.id, "created_at": version.created_at, "counts": list_counts(data_json)}
+
 @router.get("/{project_id}/versions", response_model=List[dict])
-def list_circuit_versions(project_id: int, db: Session = Depends(get_db), current_user: models.User = Depends(get_current_user)):
+def list_circuit_versions(project_id: int, db: Session = Depends(get_read_db), current_user: models.User = Depends(get_current_user)):
     member = db.query(models.ProjectMember).filter_by(project_id=project_id, user_id=current_user.id).first()
     if not member:
         raise HTTPException(status_code=403, detail="Not a project member")
@@ -48,36 +77,119 @@ def simulate_circuit(project_id: int, request: CircuitSimulationRequest, db: Ses
     member = db.query(models.ProjectMember).filter_by(project_id=project_id, user_id=current_user.id).first()
     if not member:
         raise HTTPException(status_code=403, detail="Not a project member")
+    # Admission control: reject fast when the company is over its plan's quota
+    limits = get_plan_limits(db, current_user.company_id)
+    try:
+        scheduler.reserve(current_user.company_id, limits)
+    except AdmissionError as e:
+        raise HTTPException(
+            status_code=429,
+            detail={"message": "Too many simulations in flight", "plan": limits["plan"], "in_flight": e.in_flight, "limit": e.limit},
+            headers={"Retry-After": str(e.retry_after)},
+        )
     try:
         # Parse the circuit data (assuming it's JSON string)
         import json
         circuit_data = json.loads(request.circuit_data)
         voltage = float(circuit_data.get("voltage", 0))
         resistances = circuit_data.get("resistances", [])
-        task = run_short_circuit_simulation.apply_async(args=[voltage, resistances])
-        # Store simulation with pending result
-        sim = models.Simulation(project_id=project_id, result_json={"task_id": task.id, "status": "pending"})
+        # Store simulation with pending result before dispatch so the worker can write back to it
+        task_id = str(uuid.uuid4())
+        sim = models.Simulation(project_id=project_id, result_json={"task_id": task_id, "status": "pending"})
         db.add(sim)
+        db.flush()
+        project_stats.record_simulation(db, project_id, sim.id)
         db.commit()
         db.refresh(sim)
-        return {"id": sim.id, "simulated_at": sim.simulated_at, "task_id": task.id, "status": "pending"}
+    except Exception as e:
+        scheduler.cancel(current_user.company_id)
+        return {"status": "error", "error": str(e)}
+    try:
+        # Queued per company; dispatched to Celery in weighted fair order.
+        # enqueue gives the reservation back itself if the job cannot be queued.
+        scheduler.enqueue(current_user.company_id, limits, run_short_circuit_simulation.name, [voltage, resistances], {"simulation_id": sim.id}, task_id)
     except Exception as e:
         return {"status": "error", "error": str(e)}
+    return {"id": sim.id, "simulated_at": sim.simulated_at, "task_id": task_id, "status": "pending"}
+
+@router.post("/{project_id}/contingency", response_model=dict)
+def run_contingency(project_id: int, request: ContingencyRequest, db: Session = Depends(get_db), current_user: models.User = Depends(get_current_user)):
+    member = db.query(models.ProjectMember).filter_by(project_id=project_id, user_id=current_user.id).first()
+    if not member:
+        raise HTTPException(status_code=403, detail="Not a project member")
+    # N-1 analysis of the requested version, or the latest one
+    versions = db.query(models.CircuitVersion.id).filter_by(project_id=project_id)
+    if request.version_id is not None:
+        versions = versions.filter_by(id=request.version_id)
+    version = versions.order_by(models.CircuitVersion.created_at.desc()).first()
+    if not version:
+        raise HTTPException(status_code=404, detail="Circuit version not found")
+    limits = get_plan_limits(db, current_user.company_id)
+    try:
+        scheduler.reserve(current_user.company_id, limits)
+    except AdmissionError as e:
+        raise HTTPException(
+            status_code=429,
+            detail={"message": "Too many simulations in flight", "plan": limits["plan"], "in_flight": e.in_flight, "limit": e.limit},
+            headers={"Retry-After": str(e.retry_after)},
+        )
+    try:
+        task_id = str(uuid.uuid4())
+        sim = models.Simulation(project_id=project_id, result_json={"task_id": task_id, "status": "pending", "analysis": "n-1", "version_id": version.id})
+        db.add(sim)
+        db.flush()
+        project_stats.record_simulation(db, project_id, sim.id)
+        db.commit()
+        db.refresh(sim)
+    except Exception:
+        scheduler.cancel(current_user.company_id)
+        raise
+    scheduler.enqueue(current_user.company_id, limits, run_contingency_analysis.name, [version.id], {"simulation_id": sim.id}, task_id, timeout=CONTINGENCY_TASK_TIMEOUT)
+    return {"id": sim.id, "simulated_at": sim.simulated_at, "task_id": task_id, "status": "pending"}
 
 @router.get("/simulation_result/{task_id}", response_model=dict)
 def get_simulation_result(task_id: str):
     result = AsyncResult(task_id, app=celery_app)
     if result.state == "PENDING":
         return {"status": "pending"}
+    elif result.state == "PROGRESS":
+        # Streamed partial results, e.g. the worst contingencies found so far
+        return {"status": "running", "progress": result.info}
     elif result.state == "SUCCESS":
         return {"status": "success", "result": result.result}
     else:
         return {"status": "error", "error": str(result.result)}
 
 @router.get("/{project_id}/simulations", response_model=List[dict])
-def list_simulations(project_id: int, db: Session = Depends(get_db), current_user: models.User = Depends(get_current_user)):
+def list_simulations(project_id: int, db: Session = Depends(get_read_db), current_user: models.User = Depends(get_current_user)):
     member = db.query(models.ProjectMember).filter_by(project_id=project_id, user_id=current_user.id).first()
     if not member:
         raise HTTPException(status_code=403, detail="Not a project member")
     sims = db.query(models.Simulation).filter_by(project_id=project_id).order_by(models.Simulation.simulated_at.desc()).all()
     return [{"id": s.id, "simulated_at": s.simulated_at, "result": s.result_json} for s in sims]
+
+@router.get("/{project_id}/versions/{version_id}/data", response_model=dict)
+def read_circuit_version_data(project_id: int, version_id: int, field: str, offset: int = 0, limit: int = 100, db: Session = Depends(get_db), current_user: models.User = Depends(get_current_user)):
+    member = db.query(models.ProjectMember).filter_by(project_id=project_id, user_id=current_user.id).first()
+    if not member:
+        raise HTTPException(status_code=403, detail="Not a project member")
+    version = db.query(models.CircuitVersion).filter_by(id=version_id, project_id=project_id).first()
+    if not version:
+        raise HTTPException(status_code=404, detail="Circuit version not found")
+    try:
+        return read_json_range(version.data_json, field, offset, limit)
+    except KeyError:
+        raise HTTPException(status_code=404, detail=f"Field '{field}' not found")
+
+@router.get("/{project_id}/simulations/{simulation_id}/result", response_model=dict)
+def read_simulation_result(project_id: int, simulation_id: int, field: str, offset: int = 0, limit: int = 100, db: Session = Depends(get_db), current_user: models.User = Depends(get_current_user)):
+    member = db.query(models.ProjectMember).filter_by(project_id=project_id, user_id=current_user.id).first()
+    if not member:
+        raise HTTPException(status_code=403, detail="Not a project member")
+    sim = db.query(models.Simulation).filter_by(id=simulation_id, project_id=project_id).first()
+    if not sim:
+        raise HTTPException(status_code=404, detail="Simulation not found")
+    try:
+        return read_json_range(sim.result_json, field, offset, limit)
+    except KeyError:
+        raise HTTPException(status_code=404, detail=f"Field '{field}' not found")
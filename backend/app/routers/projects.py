@@ -2,7 +2,10 @@ from fastapi import APIRouter, Depends, HTTPException
 from sqlalchemy.orm import Session
 from app.database import SessionLocal
 from app import models, schemas
+from app.utils.db_routing import get_read_db
 from app.utils.security import get_current_user, require_company_admin
+from app.utils.blob_store import delete_blobs
+from app.utils import project_stats
 from typing import List
 from pydantic import BaseModel
 
@@ -22,6 +25,8 @@ def get_db():
 def create_project(project_data: ProjectCreate, db: Session = Depends(get_db), current_user: models.User = Depends(get_current_user)):
     project = models.Project(name=project_data.name, company_id=current_user.company_id, owner_id=current_user.id)
     db.add(project)
+    db.flush()
+    project_stats.init_project(db, project.id, project.created_at)
     db.commit()
     db.refresh(project)
     # Add owner as project member (editor)
@@ -31,12 +36,18 @@ def create_project(project_data: ProjectCreate, db: Session = Depends(get_db), c
     return {"id": project.id, "name": project.name, "created_at": project.created_at.isoformat() if project.created_at else None}
 
 @router.get("/", response_model=List[dict])
-def list_projects(db: Session = Depends(get_db), current_user: models.User = Depends(get_current_user)):
-    projects = db.query(models.Project).filter(models.Project.company_id == current_user.company_id).all()
-    return [{"id": p.id, "name": p.name, "created_at": p.created_at.isoformat() if p.created_at else None} for p in projects]
+def list_projects(db: Session = Depends(get_read_db), current_user: models.User = Depends(get_current_user)):
+    # Single indexed query: projects by company joined with their maintained stats
+    rows = (
+        db.query(models.Project, models.ProjectStats)
+        .outerjoin(models.ProjectStats, models.ProjectStats.project_id == models.Project.id)
+        .filter(models.Project.company_id == current_user.company_id)
+        .all()
+    )
+    return [{"id": p.id, "name": p.name, "created_at": p.created_at.isoformat() if p.created_at else None, "stats": project_stats.stats_dict(stats)} for p, stats in rows]
 
 @router.get("/{project_id}", response_model=dict)
-def get_project(project_id: int, db: Session = Depends(get_db), current_user: models.User = Depends(get_current_user)):
+def get_project(project_id: int, db: Session = Depends(get_read_db), current_user: models.User = Depends(get_current_user)):
     project = db.query(models.Project).filter(models.Project.id == project_id, models.Project.company_id == current_user.company_id).first()
     if not project:
         raise HTTPException(status_code=404, detail="Project not found")
@@ -62,12 +73,18 @@ def delete_project(project_id: int, db: Session = Depends(get_db), current_user:
     # Delete simulations
     db.query(models.Simulation).filter(models.Simulation.project_id == project_id).delete()
     
+    # Delete activity stats
+    db.query(models.ProjectStats).filter(models.ProjectStats.project_id == project_id).delete()
+    
     # Delete audit logs
     db.query(models.AuditLog).filter(models.AuditLog.project_id == project_id).delete()
     
     # Finally delete the project
     db.delete(project)
     db.commit()
+
+    # Remove offloaded versions and results from the blob store
+    delete_blobs(f"projects/{project_id}")
     return {"message": "Project deleted"}
 
 @router.post("/{project_id}/add_member")
@@ -2,6 +2,7 @@ from fastapi import APIRouter, Depends, HTTPException, status
 from sqlalchemy.orm import Session
 from app.database import SessionLocal
 from app import models, schemas
+from app.utils.db_routing import get_read_db
 from app.utils.security import get_current_user, require_company_admin
 
 router = APIRouter()
@@ -18,7 +19,7 @@ def get_current_user_info(current_user: models.User = Depends(get_current_user))
     return current_user
 
 @router.get("/", response_model=list[schemas.UserRead])
-def list_users(db: Session = Depends(get_db), current_user: models.User = Depends(get_current_user)):
+def list_users(db: Session = Depends(get_read_db), current_user: models.User = Depends(get_current_user)):
     users = db.query(models.User).filter(models.User.company_id == current_user.company_id).all()
     return users
 
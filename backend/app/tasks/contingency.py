@@ -0,0 +1,111 @@
+from app.celery_worker import celery_app
+from app.database import SessionLocal
+from app import models
+from app.utils.blob_store import load_json
+from app.utils.contingency import NetworkModel, NetworkError, run_contingencies
+from app.utils.scheduling import scheduler
+from app.tasks.simulation import store_simulation_result
+import multiprocessing
+import json
+import heapq
+import logging
+import os
+import time
+
+PROGRESS_INTERVAL = 0.5  # seconds between streamed progress updates
+PROGRESS_TOP = 20  # worst outages included in each progress update
+RESULT_TOP = 20  # worst outages in the task result; the full ranking is read from the simulation
+# Large networks run far longer than a short-circuit simulation before the scheduler reaps them
+CONTINGENCY_TASK_TIMEOUT = int(os.getenv("CONTINGENCY_TASK_TIMEOUT", str(4 * 60 * 60)))
+
+def _load_network(version_id):
+    db = SessionLocal()
+    try:
+        version = db.query(models.CircuitVersion).filter_by(id=version_id).first()
+        if version is None:
+            raise NetworkError(f"Circuit version {version_id} not found")
+        data = load_json(version.data_json)
+        if isinstance(data, str):
+            data = json.loads(data)
+        if not isinstance(data, dict):
+            raise NetworkError("Circuit version has no network data")
+        return NetworkModel(data)
+    finally:
+        db.close()
+
+def _analyse(task, version_id, workers):
+    model = _load_network(version_id)
+    if multiprocessing.current_process().daemon:
+        # Daemonic (prefork) workers cannot start a process pool
+        logging.warning("Contingency analysis running single-process; start its worker with -P solo to use all cores")
+        workers = 1
+    start = time.perf_counter()
+    total = model.outage_count
+    done = 0
+    violations, islanding = [], []
+    worst = []  # min-heap of (severity, sequence) for the streamed ranking
+    last_update = 0.0
+    for chunk in run_contingencies(model, workers=workers):
+        for outage in chunk:
+            if outage["islanding"]:
+                islanding.append(model.branch_label(outage["branch"]))
+            elif outage["overload_count"]:
+                violations.append(outage)
+                heapq.heappush(worst, (outage["severity"], len(violations), outage))
+                if len(worst) > PROGRESS_TOP:
+                    heapq.heappop(worst)
+        done += len(chunk)
+        now = time.perf_counter()
+        if now - last_update >= PROGRESS_INTERVAL and task.request.id:
+            ranked = [model.describe(o) for _, _, o in sorted(worst, key=lambda item: item[0], reverse=True)]
+            task.update_state(state="PROGRESS", meta={"done": done, "total": total, "violations": ranked})
+            last_update = now
+    elapsed = time.perf_counter() - start
+    violations.sort(key=lambda o: o["severity"], reverse=True)
+    return {
+        "status": "ok",
+        "analysis": "n-1",
+        "outages": total,
+        "generator_outages": len(model.gen_rows),
+        "violating_outages": len(violations),
+        "islanding": islanding,
+        "violations": [model.describe(o) for o in violations],
+        "elapsed_seconds": round(elapsed, 3),
+        "outages_per_second": round(total / elapsed, 1) if elapsed else None,
+    }
+
+def _task_result(result, stored, simulation_id):
+    """Compact task result; the full ranking stays on the Simulation row (paged reads)."""
+    compact = {key: value for key, value in result.items() if key not in ("violations", "islanding")}
+    compact["simulation_id"] = simulation_id
+    compact["violations"] = result.get("violations", [])[:RESULT_TOP]
+    compact["islanding"] = result.get("islanding", [])[:RESULT_TOP]
+    compact["islanding_count"] = len(result.get("islanding", []))
+    if isinstance(stored, dict) and "blob" in stored:
+        compact["blob"] = stored["blob"]
+        compact["summary"] = stored.get("summary")
+    return compact
+
+@celery_app.task(bind=True)
+def run_contingency_analysis(self, version_id, simulation_id=None, company_id=None, workers=None):
+    result, stored = None, None
+    try:
+        try:
+            result = _analyse(self, version_id, workers)
+        except (NetworkError, ValueError, KeyError) as e:
+            result = {"status": "error", "error": str(e)}
+        except Exception as e:
+            # e.g. MemoryError on a huge network: never leave the simulation pending
+            logging.exception("Contingency analysis failed")
+            result = {"status": "error", "error": f"Contingency analysis failed: {type(e).__name__}"}
+            raise
+        finally:
+            if simulation_id is not None and result is not None:
+                stored = store_simulation_result(simulation_id, result)
+    finally:
+        if company_id is not None:
+            scheduler.release(company_id, self.request.id)
+    logging.info(f"Contingency analysis complete: {result.get('outages')} outages, {result.get('violating_outages')} with violations")
+    if simulation_id is None:
+        return result
+    return _task_result(result, stored, simulation_id)
@@ -0,0 +1,7 @@
+from app.celery_worker import celery_app
+from app.utils.scheduling import scheduler
+
+@celery_app.task
+def pump_scheduler():
+    # Reaps timed-out tasks and dispatches queued jobs into any freed slots
+    scheduler.pump()
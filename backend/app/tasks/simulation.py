@@ -1,9 +1,50 @@
 from app.celery_worker import celery_app
+from app.database import SessionLocal
+from app import models
+from app.utils.blob_store import offload_json
+from app.utils.scheduling import scheduler
+from app.utils import project_stats
 import numpy as np
 import logging
 
+def store_simulation_result(simulation_id, result):
+    # Large results go to the blob store; the row keeps a pointer and summary.
+    # Returns what was stored on the row.
+    db = SessionLocal()
+    try:
+        sim = db.query(models.Simulation).filter_by(id=simulation_id).first()
+        if sim is None:
+            logging.warning(f"Simulation {simulation_id} not found, result not stored")
+            return None
+        task_id = (sim.result_json or {}).get("task_id")
+        document = {"task_id": task_id, **result}
+        sim.result_json = offload_json(f"projects/{sim.project_id}/simulations/{sim.id}", document)
+        project_stats.record_result(db, sim.project_id, sim.id, result.get("status", "unknown"))
+        db.commit()
+        return sim.result_json
+    finally:
+        db.close()
+
 @celery_app.task
-def run_short_circuit_simulation(voltage, resistances, notify_email=None):
+def run_short_circuit_simulation(voltage, resistances, notify_email=None, simulation_id=None, company_id=None):
+    try:
+        result = _short_circuit(voltage, resistances)
+        if simulation_id is not None:
+            store_simulation_result(simulation_id, result)
+    finally:
+        # Free the company's quota and worker slot, dispatching the next fair job
+        if company_id is not None:
+            scheduler.release(company_id, run_short_circuit_simulation.request.id)
+    # Notification stub
+    msg = f"Simulation complete. Result: {result}"
+    if notify_email:
+        # Here you would send an email using SendGrid/Resend
+        logging.info(f"[EMAIL to {notify_email}] {msg}")
+    else:
+        logging.info(msg)
+    return result
+
+def _short_circuit(voltage, resistances):
     try:
         voltage = float(voltage)
         resistances = np.array(resistances, dtype=float)
@@ -13,16 +54,9 @@ def run_short_circuit_simulation(voltage, resistances, notify_email=None):
         fault_current = voltage / total_resistance
         result = {
             "status": "ok",
-            "fault_current": fault_current,
-            "total_resistance": total_resistance
+            "fault_current": float(fault_current),
+            "total_resistance": float(total_resistance)
         }
     except Exception as e:
         result = {"status": "error", "error": str(e)}
-    # Notification stub
-    msg = f"Simulation complete. Result: {result}"
-    if notify_email:
-        # Here you would send an email using SendGrid/Resend
-        logging.info(f"[EMAIL to {notify_email}] {msg}")
-    else:
-        logging.info(msg)
     return result
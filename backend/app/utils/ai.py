@@ -1,6 +1,7 @@
 import os
 import openai
 from app.config import settings
+from app.utils.semantic_cache import SemanticCache, OpenAIEmbedder
 import redis
 import hashlib
 import json
@@ -14,22 +15,51 @@ REDIS_URL = os.getenv("REDIS_URL", "redis://redis:6379/0")
 redis_client = redis.Redis.from_url(REDIS_URL)
 CACHE_TTL = 60 * 60  # 1 hour
 
-def ask_gpt(prompt: str, system: str = "You are an expert electrical engineer AI assistant."):
-    cache_key = "ai:" + hashlib.sha256((system + "|" + prompt).encode()).hexdigest()
+# Semantic cache: reworded prompts within the similarity threshold reuse answers.
+# It needs a real embedding model; any other setting turns it off (exact-match
+# Redis caching still applies). Tests install a cache with the local embedder.
+SEMANTIC_CACHE_EMBEDDER = os.getenv("SEMANTIC_CACHE_EMBEDDER", "openai")  # "openai" or "off"
+SEMANTIC_CACHE_MODEL = os.getenv("SEMANTIC_CACHE_MODEL", "text-embedding-3-small")
+SEMANTIC_CACHE_THRESHOLD = float(os.getenv("SEMANTIC_CACHE_THRESHOLD", "0.95"))
+SEMANTIC_CACHE_MAX_ENTRIES = int(os.getenv("SEMANTIC_CACHE_MAX_ENTRIES", "10000"))
+
+semantic_cache = None
+if SEMANTIC_CACHE_EMBEDDER == "openai":
+    semantic_cache = SemanticCache(
+        embedder=OpenAIEmbedder(SEMANTIC_CACHE_MODEL),
+        threshold=SEMANTIC_CACHE_THRESHOLD,
+        max_entries=SEMANTIC_CACHE_MAX_ENTRIES,
+        ttl=CACHE_TTL,
+    )
+
+def ask_gpt(prompt: str, system: str = "You are an expert electrical engineer AI assistant.", company_id: int = None, context: str = ""):
+    full_prompt = context + prompt
+    cache_key = "ai:" + hashlib.sha256((str(company_id) + "|" + system + "|" + full_prompt).encode()).hexdigest()
     cached = redis_client.get(cache_key)
     if cached:
         return json.loads(cached)
+    # Only the question is matched semantically; company, system prompt and
+    # context must be identical, so answers never cross tenants or projects
+    scope = hashlib.sha256((system + "\0" + context).encode()).hexdigest()
+    namespace = (company_id, scope)
+    vector = None
+    if semantic_cache is not None:
+        similar, vector = semantic_cache.get(namespace, prompt)
+        if similar is not None:
+            return similar
     try:
         response = openai.ChatCompletion.create(
             model=MODEL,
             messages=[
                 {"role": "system", "content": system},
-                {"role": "user", "content": prompt}
+                {"role": "user", "content": full_prompt}
             ],
             max_tokens=MAX_TOKENS,
         )
         answer = response.choices[0].message.content
         redis_client.setex(cache_key, CACHE_TTL, json.dumps(answer))
+        if semantic_cache is not None:
+            semantic_cache.set(namespace, prompt, answer, vector)
         return answer
     except Exception as e:
         return f"[AI Error] {str(e)}"
@@ -0,0 +1,159 @@
+import json
+from collections import Counter
+
+from app import models
+
+# Token-budgeted context for the AI assistant.
+# Sections are rendered as compact JSON instead of Python repr, large simulation
+# results are reduced to their most relevant items and aggregates, and each
+# section is shrunk until the whole context fits the budget.
+
+DEFAULT_CONTEXT_TOKENS = 1500
+MAX_CONTEXT_TOKENS = 8000
+TOP_ITEMS = 10
+# Keys that rank items inside large result lists, most relevant first
+RANK_KEYS = ("fault_current", "current", "loading", "loading_percent", "voltage_deviation", "value")
+VIOLATION_KEYS = ("violated", "violation", "overloaded", "limit_exceeded")
+CIRCUIT_KEYS = ("voltage", "resistances", "components", "elements", "buses", "branches", "summary")
+
+
+def estimate_tokens(text: str) -> int:
+    # ~4 characters per token for English/JSON with the GPT tokenizers
+    return (len(text) + 3) // 4
+
+
+def _compact(value) -> str:
+    return json.dumps(value, separators=(",", ":"), sort_keys=True, default=str)
+
+
+def _rank_key(items: list):
+    for key in RANK_KEYS:
+        if any(isinstance(item.get(key), (int, float)) for item in items):
+            return key
+    return None
+
+
+def _magnitude(value) -> float:
+    # Client-supplied results may mix types ("n/a", None) in a ranked field
+    if isinstance(value, (int, float)) and not isinstance(value, bool):
+        return abs(value)
+    return 0
+
+
+def _is_violation(item: dict) -> bool:
+    return any(bool(item.get(key)) for key in VIOLATION_KEYS)
+
+
+def _aggregates(items: list) -> dict:
+    stats = {}
+    for item in items:
+        for key, value in item.items():
+            if isinstance(value, (int, float)) and not isinstance(value, bool):
+                s = stats.setdefault(key, {"min": value, "max": value, "sum": 0.0, "n": 0})
+                s["min"] = min(s["min"], value)
+                s["max"] = max(s["max"], value)
+                s["sum"] += value
+                s["n"] += 1
+    return {
+        key: {"min": s["min"], "max": s["max"], "mean": round(s["sum"] / s["n"], 6)}
+        for key, s in stats.items()
+    }
+
+
+def _summarize_list(items: list, top: int):
+    if len(items) <= top:
+        return items
+    if not all(isinstance(item, dict) for item in items):
+        numbers = [v for v in items if isinstance(v, (int, float)) and not isinstance(v, bool)]
+        summary = {"count": len(items), "first": items[:top]}
+        if numbers:
+            summary["min"] = min(numbers)
+            summary["max"] = max(numbers)
+        return summary
+    rank = _rank_key(items)
+    violations = [item for item in items if _is_violation(item)]
+    others = [item for item in items if not _is_violation(item)]
+    if rank:
+        for group in (violations, others):
+            group.sort(key=lambda item: _magnitude(item.get(rank)), reverse=True)
+    summary = {"count": len(items), "aggregates": _aggregates(items)}
+    if violations:
+        summary["violations"] = len(violations)
+    worst = (violations + others)[:top]
+    summary["top" if rank is None else f"top_by_{rank}"] = worst
+    return summary
+
+
+def summarize_simulation_results(results, top: int = TOP_ITEMS):
+    if isinstance(results, dict):
+        return {key: summarize_simulation_results(value, top) for key, value in results.items()}
+    if isinstance(results, list):
+        return _summarize_list([summarize_simulation_results(v, top) for v in results], top)
+    return results
+
+
+def dedupe_components(components: list) -> list:
+    counts = Counter(_compact(c) if not isinstance(c, str) else c for c in components)
+    deduped = []
+    for key, count in counts.items():
+        entry = key if count == 1 else f"{count}x {key}"
+        deduped.append(entry)
+    return deduped
+
+
+def load_circuit_data(db, project_id: int):
+    version = (
+        db.query(models.CircuitVersion)
+        .filter_by(project_id=project_id)
+        .order_by(models.CircuitVersion.created_at.desc())
+        .first()
+    )
+    if version is None:
+        return None
+    data = version.data_json
+    if isinstance(data, str):
+        try:
+            data = json.loads(data)
+        except ValueError:
+            return {"raw": data}
+    if isinstance(data, dict):
+        relevant = {key: data[key] for key in CIRCUIT_KEYS if key in data}
+        return relevant or data
+    return {"raw": data}
+
+
+def _fit(label: str, value, budget: int):
+    """Render a section within `budget` tokens, shrinking lists before truncating."""
+    if budget <= 0:
+        return ""
+    top = TOP_ITEMS
+    while True:
+        shrunk = summarize_simulation_results(value, top) if not isinstance(value, str) else value
+        text = f"{label}: {shrunk if isinstance(shrunk, str) else _compact(shrunk)}\n"
+        if estimate_tokens(text) <= budget or top <= 1:
+            break
+        top //= 2
+    if estimate_tokens(text) > budget:
+        text = text[:budget * 4 - 4] + "...\n"
+    return text
+
+
+def build_context(project_context=None, components=None, simulation_results=None,
+                  circuit_data=None, max_tokens: int = DEFAULT_CONTEXT_TOKENS) -> str:
+    sections = []
+    if project_context:
+        sections.append(("Project context", project_context))
+    if simulation_results:
+        sections.append(("Simulation results", simulation_results))
+    if circuit_data:
+        sections.append(("Circuit", circuit_data))
+    if components:
+        sections.append(("Available components", dedupe_components(components)))
+    context = ""
+    remaining = max_tokens
+    # Sections are in priority order; each may use what the previous ones left
+    for i, (label, value) in enumerate(sections):
+        text = _fit(label, value, remaining // (len(sections) - i))
+        context += text
+        remaining -= estimate_tokens(text)
+    return context
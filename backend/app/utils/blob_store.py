@@ -0,0 +1,277 @@
+import gzip
+import json
+import os
+import shutil
+from itertools import islice
+
+from app.utils.ai_context import summarize_simulation_results
+
+# External storage for large JSON documents (simulation results, circuit data).
+# Documents above BLOB_THRESHOLD_BYTES are split: every top-level list is cut
+# into gzip-compressed pages of about BLOB_PAGE_BYTES stored as separate blobs,
+# and the database row keeps only a pointer with per-page item counts plus a
+# summary. If the remaining fields are still above the threshold they are
+# written as one more blob. Paged reads fetch just the pages covering the
+# requested range.
+
+BLOB_STORE = os.getenv("BLOB_STORE", "local")  # "local" or "s3"
+BLOB_STORE_PATH = os.getenv("BLOB_STORE_PATH", "/tmp/ampflux-blobs")
+BLOB_STORE_BUCKET = os.getenv("BLOB_STORE_BUCKET", "ampflux")
+S3_ENDPOINT_URL = os.getenv("S3_ENDPOINT_URL") or None
+BLOB_THRESHOLD_BYTES = int(os.getenv("BLOB_THRESHOLD_BYTES", str(256 * 1024)))
+BLOB_PAGE_BYTES = int(os.getenv("BLOB_PAGE_BYTES", str(128 * 1024)))
+MAX_PAGE_LIMIT = 10000
+INLINE_STRING_CHARS = 256
+SUMMARY_MAX_BYTES = 16 * 1024
+MAX_DESCRIBED_FIELDS = 100
+
+
+class LocalBlobStore:
+    """Blob store on the local filesystem (development and tests)."""
+
+    def __init__(self, root: str):
+        self.root = root
+
+    def _path(self, key: str) -> str:
+        path = os.path.normpath(os.path.join(self.root, key))
+        if not path.startswith(os.path.normpath(self.root) + os.sep):
+            raise ValueError(f"Invalid blob key: {key}")
+        return path
+
+    def put(self, key: str, data: bytes):
+        path = self._path(key)
+        os.makedirs(os.path.dirname(path), exist_ok=True)
+        tmp = path + ".tmp"
+        with open(tmp, "wb") as f:
+            f.write(data)
+        os.replace(tmp, path)
+
+    def get(self, key: str) -> bytes:
+        with open(self._path(key), "rb") as f:
+            return f.read()
+
+    def delete_prefix(self, prefix: str):
+        shutil.rmtree(self._path(prefix), ignore_errors=True)
+
+
+class S3BlobStore:
+    """Blob store on any S3-compatible service (AWS S3, MinIO, ...)."""
+
+    def __init__(self, bucket: str, endpoint_url: str = None, client=None):
+        if client is None:
+            import boto3
+            client = boto3.client("s3", endpoint_url=endpoint_url)
+        self.bucket = bucket
+        self.client = client
+
+    def put(self, key: str, data: bytes):
+        self.client.put_object(Bucket=self.bucket, Key=key, Body=data)
+
+    def get(self, key: str) -> bytes:
+        return self.client.get_object(Bucket=self.bucket, Key=key)["Body"].read()
+
+    def delete_prefix(self, prefix: str):
+        paginator = self.client.get_paginator("list_objects_v2")
+        for page in paginator.paginate(Bucket=self.bucket, Prefix=prefix.rstrip("/") + "/"):
+            objects = [{"Key": obj["Key"]} for obj in page.get("Contents", [])]
+            if objects:
+                self.client.delete_objects(Bucket=self.bucket, Delete={"Objects": objects})
+
+
+_store = None
+
+
+def get_blob_store():
+    global _store
+    if _store is None:
+        if BLOB_STORE == "s3":
+            _store = S3BlobStore(BLOB_STORE_BUCKET, endpoint_url=S3_ENDPOINT_URL)
+        else:
+            _store = LocalBlobStore(BLOB_STORE_PATH)
+    return _store
+
+
+def _dumps(value) -> bytes:
+    return json.dumps(value, separators=(",", ":"), default=str).encode()
+
+
+class PagedListWriter:
+    """Writes one list as gzip pages of about BLOB_PAGE_BYTES while items arrive."""
+
+    def __init__(self, store, prefix: str, key: str):
+        self.store = store
+        self.prefix = prefix
+        self.key = key
+        self.count = 0
+        self.pages = []
+        self._chunks = []
+        self._size = 0
+
+    def append(self, item):
+        data = _dumps(item)
+        if self._chunks and self._size + len(data) > BLOB_PAGE_BYTES:
+            self._flush()
+        self._chunks.append(data)
+        self._size += len(data) + 1
+        self.count += 1
+
+    def _flush(self):
+        self.store.put(f"{self.prefix}/{self.key}/{len(self.pages)}.json.gz",
+                       gzip.compress(b"[" + b",".join(self._chunks) + b"]"))
+        self.pages.append(len(self._chunks))
+        self._chunks, self._size = [], 0
+
+    def close(self) -> dict:
+        if self._chunks:
+            self._flush()
+        return {"count": self.count, "pages": self.pages}
+
+
+class DocumentSpool:
+    """Builds a document from streamed list items without holding it in memory.
+
+    Items are buffered until the document passes BLOB_THRESHOLD_BYTES, after
+    which every list is written straight to paged blobs, laid out as
+    offload_json would. `finish` returns what to keep on the row.
+    """
+
+    def __init__(self, prefix: str, store=None):
+        self.prefix = prefix
+        self.store = store or get_blob_store()
+        self._lists = {}
+        self._size = 0
+        self._writers = None
+
+    def append(self, key: str, item):
+        if self._writers is not None:
+            self._writer(key).append(item)
+            return
+        self._lists.setdefault(key, []).append(item)
+        self._size += len(_dumps(item)) + 1
+        if self._size > BLOB_THRESHOLD_BYTES:
+            self._writers = {}
+            for name, items in self._lists.items():
+                for buffered in items:
+                    self._writer(name).append(buffered)
+            self._lists = {}
+
+    def _writer(self, key: str):
+        if key not in self._writers:
+            self._writers[key] = PagedListWriter(self.store, self.prefix, key)
+        return self._writers[key]
+
+    def finish(self, head: dict) -> dict:
+        if self._writers is None:
+            return {**head, **self._lists}
+        fields = {key: writer.close() for key, writer in self._writers.items()}
+        summary = {key: {"count": meta["count"]} for key, meta in fields.items()}
+        return {**head, "blob": {"prefix": self.prefix, "fields": fields}, "summary": summary}
+
+    def discard(self):
+        if self._writers is not None:
+            self.store.delete_prefix(self.prefix)
+        self._lists, self._writers = {}, None
+
+
+def _read_page(store, prefix: str, key: str, page_no: int) -> list:
+    return json.loads(gzip.decompress(store.get(f"{prefix}/{key}/{page_no}.json.gz")))
+
+
+def _describe(value):
+    if isinstance(value, dict):
+        return {"type": "object", "keys": len(value)}
+    if isinstance(value, str) and len(value) > INLINE_STRING_CHARS:
+        return {"type": "string", "length": len(value)}
+    return value
+
+
+def offload_json(prefix: str, document, store=None):
+    """Return what to keep inline for `document`, writing large parts to the blob store."""
+    if not isinstance(document, dict):
+        return document
+    if len(_dumps(document)) <= BLOB_THRESHOLD_BYTES:
+        return document
+    store = store or get_blob_store()
+    inline, fields = {}, {}
+    for key, value in document.items():
+        if isinstance(value, list):
+            writer = PagedListWriter(store, prefix, key)
+            for item in value:
+                writer.append(item)
+            fields[key] = writer.close()
+        else:
+            inline[key] = value
+    blob = {"prefix": prefix, "fields": fields}
+    summary = summarize_simulation_results({key: document[key] for key in fields})
+    if len(_dumps(summary)) > SUMMARY_MAX_BYTES:
+        summary = {key: {"count": meta["count"]} for key, meta in fields.items()}
+    if len(_dumps(inline)) > BLOB_THRESHOLD_BYTES:
+        # Still too large (e.g. results keyed by bus id): store the rest as one
+        # blob, keeping only a few small scalars (status, ids) on the row
+        store.put(f"{prefix}/rest.json.gz", gzip.compress(_dumps(inline)))
+        blob["rest"] = len(inline)
+        kept, budget = {}, SUMMARY_MAX_BYTES
+        for key, value in inline.items():
+            size = len(_dumps({key: value}))
+            if _describe(value) is value and not isinstance(value, list) and size <= budget:
+                kept[key] = value
+                budget -= size
+        described = islice(((key, value) for key, value in inline.items() if key not in kept), MAX_DESCRIBED_FIELDS)
+        summary.update({key: _describe(value) for key, value in described})
+        inline = kept
+    return {**inline, "blob": blob, "summary": summary}
+
+
+def read_json_range(document, field: str, offset: int = 0, limit: int = 100, store=None):
+    """Read items [offset, offset + limit) of list `field`, loading only the pages needed."""
+    limit = max(0, min(limit, MAX_PAGE_LIMIT))
+    offset = max(0, offset)
+    blob = document.get("blob") if isinstance(document, dict) else None
+    if blob and field in blob["fields"]:
+        meta = blob["fields"][field]
+        store = store or get_blob_store()
+        end = min(offset + limit, meta["count"])
+        items, base = [], 0
+        for page_no, count in enumerate(meta["pages"]):
+            if base >= end:
+                break
+            if base + count > offset:
+                page = _read_page(store, blob["prefix"], field, page_no)
+                items.extend(page[max(offset - base, 0):end - base])
+            base += count
+        return {"field": field, "offset": offset, "limit": limit, "total": meta["count"], "items": items}
+    value = document.get(field) if isinstance(document, dict) else None
+    if not isinstance(value, list):
+        raise KeyError(field)
+    return {"field": field, "offset": offset, "limit": limit, "total": len(value), "items": value[offset:offset + limit]}
+
+
+def load_json(document, store=None):
+    """Reassemble the full document, reading back every offloaded page."""
+    blob = document.get("blob") if isinstance(document, dict) else None
+    if not blob:
+        return document
+    store = store or get_blob_store()
+    full = {key: value for key, value in document.items() if key not in ("blob", "summary")}
+    if blob.get("rest"):
+        full.update(json.loads(gzip.decompress(store.get(f"{blob['prefix']}/rest.json.gz"))))
+    for field, meta in blob["fields"].items():
+        items = []
+        for page_no in range(len(meta["pages"])):
+            items.extend(_read_page(store, blob["prefix"], field, page_no))
+        full[field] = items
+    return full
+
+
+def list_counts(document) -> dict:
+    """Item count of every top-level list, inline or offloaded."""
+    if not isinstance(document, dict):
+        return {}
+    counts = {key: len(value) for key, value in document.items() if isinstance(value, list)}
+    blob = document.get("blob") or {}
+    counts.update({key: meta["count"] for key, meta in blob.get("fields", {}).items()})
+    return counts
+
+
+def delete_blobs(prefix: str, store=None):
+    (store or get_blob_store()).delete_prefix(prefix)
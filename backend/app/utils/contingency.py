@@ -0,0 +1,225 @@
+import multiprocessing
+import os
+from multiprocessing import shared_memory
+
+import numpy as np
+
+# N-1 contingency analysis on a DC network model.
+# The base case is solved once: X is the inverse of the reduced bus
+# susceptance matrix (slack row/column zero), theta = X @ P and base branch
+# flows follow from theta. A branch outage is a rank-1 change of B, so its
+# effect is a cheap update of the base solution instead of a new solve:
+#   flows:  f' = f + LODF[:, k] * f[k]            (line outage distribution factors)
+#   faults: Zth'[i] = Zth[i] + Xa[i]^2 / (x_k - a.X.a)  (Sherman-Morrison on X)
+# A generator outage leaves the network unchanged; its output is picked up by
+# the slack, so flows shift by the PTDF of a transfer from its bus to the slack:
+#   flows:  f' = f - PTDF(bus -> slack) * Pg,  PTDF = (X[bus, from] - X[bus, to]) / x
+# X and the branch arrays live in shared memory; worker processes attach to
+# them and evaluate chunks of outages, streaming results back as they finish.
+
+DEFAULT_BASE_MVA = 100.0
+DEFAULT_CHUNK_SIZE = 64
+ISLANDING_TOLERANCE = 1e-9
+TOP_VIOLATIONS = 10
+
+
+class NetworkError(ValueError):
+    pass
+
+
+class NetworkModel:
+    """DC model built from imported circuit data (MATPOWER or CSV keys)."""
+
+    def __init__(self, data: dict):
+        buses = data.get("buses") or []
+        branches = data.get("branches") or []
+        if len(buses) < 2 or not branches:
+            raise NetworkError("Contingency analysis needs at least two buses and one branch")
+        self.base_mva = float(data.get("baseMVA") or DEFAULT_BASE_MVA)
+        self.bus_ids = [bus["id"] for bus in buses]
+        index = {bus_id: i for i, bus_id in enumerate(self.bus_ids)}
+        slack = next((i for i, bus in enumerate(buses) if bus.get("type") == 3), 0)
+        self.slack = slack
+
+        injections = np.zeros(len(buses))
+        for i, bus in enumerate(buses):
+            injections[i] -= float(bus.get("pd") or 0)
+        gen_rows, gen_bus, gen_pg = [], [], []
+        for row, gen in enumerate(data.get("generators") or []):
+            if gen.get("status", 1):
+                pg = float(gen.get("pg", gen.get("p")) or 0)
+                injections[index[gen["bus"]]] += pg
+                if pg and index[gen["bus"]] != slack:
+                    gen_rows.append(row)
+                    gen_bus.append(index[gen["bus"]])
+                    gen_pg.append(pg)
+        # Outage candidates: in-service generators with output away from the slack
+        # bus (which takes up the lost output), by their row in the imported data
+        self.gen_rows = np.array(gen_rows, dtype=np.int64)
+        self.gen_bus = np.array(gen_bus, dtype=np.int64)
+        self.gen_pg = np.array(gen_pg) / self.base_mva
+        for load in data.get("loads") or []:
+            injections[index[load["bus"]]] -= float(load.get("p") or 0)
+        self.injections = injections / self.base_mva
+
+        rows = [i for i, b in enumerate(branches) if b.get("status", 1) and float(b.get("x") or 0) != 0]
+        if not rows:
+            raise NetworkError("No in-service branches with non-zero reactance")
+        in_service = [branches[i] for i in rows]
+        self.branches = in_service
+        # Row of each modelled branch in the imported data, so parallel branches stay distinguishable
+        self.branch_rows = np.array(rows, dtype=np.int64)
+        self.f = np.array([index[b.get("fbus", b.get("from_bus"))] for b in in_service], dtype=np.int64)
+        self.t = np.array([index[b.get("tbus", b.get("to_bus"))] for b in in_service], dtype=np.int64)
+        self.x = np.array([float(b["x"]) for b in in_service])
+        # MW rating; 0 means unlimited in MATPOWER
+        self.rate = np.array([float(b.get("rate_a", b.get("rating")) or 0) for b in in_service])
+
+    @property
+    def outage_count(self) -> int:
+        return len(self.x) + len(self.gen_rows)
+
+    def branch_label(self, k: int) -> dict:
+        return {"index": int(self.branch_rows[k]), "from_bus": self.bus_ids[self.f[k]], "to_bus": self.bus_ids[self.t[k]]}
+
+    def generator_label(self, g: int) -> dict:
+        return {"index": int(self.gen_rows[g]), "bus": self.bus_ids[self.gen_bus[g]], "pg": float(self.gen_pg[g] * self.base_mva)}
+
+    def describe(self, result: dict) -> dict:
+        """Replace internal branch/bus indices in an outage result with network ids."""
+        if "generator" in result:
+            described = {**result, "generator": self.generator_label(result["generator"])}
+        else:
+            described = {**result, "branch": self.branch_label(result["branch"])}
+        if "overloads" in result:
+            described["overloads"] = [{**o, "branch": self.branch_label(o["branch"])} for o in result["overloads"]]
+        if result.get("weakest_bus") is not None:
+            described["weakest_bus"] = self.bus_ids[result["weakest_bus"]]
+        return described
+
+    def solve_base(self):
+        """Return (X, base flows in p.u.)."""
+        n = len(self.bus_ids)
+        b = np.zeros((n, n))
+        susceptance = 1.0 / self.x
+        np.add.at(b, (self.f, self.f), susceptance)
+        np.add.at(b, (self.t, self.t), susceptance)
+        np.add.at(b, (self.f, self.t), -susceptance)
+        np.add.at(b, (self.t, self.f), -susceptance)
+        keep = np.array([i for i in range(n) if i != self.slack])
+        try:
+            reduced = np.linalg.inv(b[np.ix_(keep, keep)])
+        except np.linalg.LinAlgError:
+            raise NetworkError("Base network is not connected")
+        x_full = np.zeros((n, n))
+        x_full[np.ix_(keep, keep)] = reduced
+        theta = x_full @ self.injections
+        flows = (theta[self.f] - theta[self.t]) / self.x
+        return x_full, flows
+
+
+def evaluate_outage(k, X, f, t, x, rate, flows, zth, base_mva):
+    """Post-outage flow violations and weakest fault level for branch k."""
+    xa = X[f[k]] - X[t[k]]  # X is symmetric, so rows equal columns
+    ptdf_col = (xa[f] - xa[t]) / x
+    denom = 1.0 - ptdf_col[k]
+    if abs(denom) < ISLANDING_TOLERANCE:
+        return {"branch": int(k), "islanding": True}
+    post = flows + ptdf_col / denom * flows[k]
+    post[k] = 0.0
+    # Thevenin reactance seen from each bus towards the slack source (0 at the slack)
+    post_zth = zth + xa * xa / (x[k] * denom)
+    return {"branch": int(k), "islanding": False, **_post_outage(post, rate, post_zth, base_mva)}
+
+
+def evaluate_generator_outage(g, X, f, t, x, rate, flows, zth, gen_bus, gen_pg, base_mva):
+    """Post-outage flow violations for generator g, its output replaced by the slack."""
+    xb = X[gen_bus[g]]
+    post = flows - (xb[f] - xb[t]) / x * gen_pg[g]
+    return {"generator": int(g), "islanding": False, **_post_outage(post, rate, zth, base_mva)}
+
+
+def _post_outage(post, rate, zth, base_mva):
+    loading = np.zeros_like(post)
+    limited = rate > 0
+    loading[limited] = np.abs(post[limited]) * base_mva / rate[limited]
+    over = np.nonzero(loading > 1.0)[0]
+    overloads = sorted(
+        ({"branch": int(l), "flow_mw": float(post[l] * base_mva), "loading": float(loading[l])} for l in over),
+        key=lambda item: item["loading"],
+        reverse=True,
+    )
+    weakest = int(np.argmax(zth))
+    return {
+        "severity": float(sum(item["loading"] - 1.0 for item in overloads)),
+        "max_loading": float(loading.max()) if len(loading) else 0.0,
+        "overloads": overloads[:TOP_VIOLATIONS],
+        "overload_count": len(overloads),
+        "weakest_bus": weakest,
+        "min_fault_level_pu": float(1.0 / zth[weakest]) if zth[weakest] > 0 else None,
+    }
+
+
+# Worker-side views onto the shared base solution
+_shared = {}
+
+
+def _attach(specs, scalars):
+    for name, (shm_name, shape, dtype) in specs.items():
+        shm = shared_memory.SharedMemory(name=shm_name)
+        _shared[name] = np.ndarray(shape, dtype=dtype, buffer=shm.buf)
+        _shared["_shm_" + name] = shm  # keep the mapping alive
+    _shared.update(scalars)
+
+
+def _evaluate_chunk(outages):
+    # Outages numbered past the last branch are generator outages
+    s = _shared
+    branches = len(s["x"])
+    return [
+        evaluate_outage(k, s["X"], s["f"], s["t"], s["x"], s["rate"], s["flows"], s["zth"], s["base_mva"])
+        if k < branches else
+        evaluate_generator_outage(k - branches, s["X"], s["f"], s["t"], s["x"], s["rate"], s["flows"], s["zth"],
+                                  s["gen_bus"], s["gen_pg"], s["base_mva"])
+        for k in outages
+    ]
+
+
+def _share(arrays: dict):
+    blocks, specs = [], {}
+    for name, array in arrays.items():
+        array = np.ascontiguousarray(array)
+        shm = shared_memory.SharedMemory(create=True, size=max(array.nbytes, 1))
+        np.ndarray(array.shape, dtype=array.dtype, buffer=shm.buf)[...] = array
+        blocks.append(shm)
+        specs[name] = (shm.name, array.shape, array.dtype.str)
+    return blocks, specs
+
+
+def run_contingencies(model: NetworkModel, workers: int = None, chunk_size: int = DEFAULT_CHUNK_SIZE):
+    """Yield lists of branch and generator outage results as worker chunks complete (unordered)."""
+    X, flows = model.solve_base()
+    zth = np.diag(X).copy()
+    arrays = {"X": X, "f": model.f, "t": model.t, "x": model.x, "rate": model.rate, "flows": flows, "zth": zth,
+              "gen_bus": model.gen_bus, "gen_pg": model.gen_pg}
+    scalars = {"base_mva": model.base_mva}
+    outages = range(model.outage_count)
+    chunks = [list(outages[i:i + chunk_size]) for i in range(0, len(outages), chunk_size)]
+    workers = workers or os.cpu_count() or 1
+    if workers == 1:
+        _shared.update(arrays)
+        _shared.update(scalars)
+        try:
+            for chunk in chunks:
+                yield _evaluate_chunk(chunk)
+        finally:
+            _shared.clear()
+        return
+    blocks, specs = _share(arrays)
+    try:
+        with multiprocessing.get_context().Pool(workers, initializer=_attach, initargs=(specs, scalars)) as pool:
+            yield from pool.imap_unordered(_evaluate_chunk, chunks)
+    finally:
+        for shm in blocks:
+            shm.close()
+            shm.unlink()
@@ -0,0 +1,172 @@
+import itertools
+import logging
+import os
+import threading
+import time
+
+import redis
+from fastapi import Request
+from sqlalchemy import create_engine, text
+from sqlalchemy.orm import sessionmaker
+
+from app.database import SessionLocal
+from app.utils.security import decode_token
+
+# Read-replica routing for read-only endpoints.
+# Replicas from DATABASE_REPLICA_URLS are used round-robin while they pass a
+# periodic health check and their replication lag is within
+# REPLICA_MAX_LAG_SECONDS. Checks run every REPLICA_HEALTH_INTERVAL, so a
+# replica may serve reads up to REPLICA_MAX_LAG_SECONDS plus one interval
+# behind the primary before it is skipped. A user who wrote within
+# REPLICA_STICKY_SECONDS (longer than that bound) is pinned to the primary so
+# they always read their own writes. With no replicas configured every read
+# goes to the primary as before.
+
+DATABASE_REPLICA_URLS = [url.strip() for url in os.getenv("DATABASE_REPLICA_URLS", "").split(",") if url.strip()]
+REPLICA_MAX_LAG_SECONDS = float(os.getenv("REPLICA_MAX_LAG_SECONDS", "5"))
+REPLICA_HEALTH_INTERVAL = float(os.getenv("REPLICA_HEALTH_INTERVAL", "10"))
+REPLICA_STICKY_SECONDS = int(os.getenv("REPLICA_STICKY_SECONDS", "20"))
+REDIS_URL = os.getenv("REDIS_URL", "redis://redis:6379/0")
+WRITE_METHODS = {"POST", "PUT", "PATCH", "DELETE"}
+
+# Seconds a Postgres standby is behind; 0 on a primary or a fully replayed
+# standby. NULL when the standby is not streaming from the primary: replay then
+# looks caught up while it is in fact falling behind. Reading the WAL receiver
+# status needs the pg_read_all_stats (or pg_monitor) role.
+LAG_QUERY = text(
+    "SELECT CASE WHEN NOT pg_is_in_recovery() THEN 0 "
+    "WHEN NOT EXISTS (SELECT 1 FROM pg_stat_wal_receiver WHERE status = 'streaming') THEN NULL "
+    "WHEN pg_last_wal_receive_lsn() = pg_last_wal_replay_lsn() THEN 0 "
+    "ELSE COALESCE(EXTRACT(EPOCH FROM now() - pg_last_xact_replay_timestamp()), 0) END"
+)
+
+
+class Replica:
+    def __init__(self, url: str):
+        # Short connect timeout so a dead replica cannot stall health checks
+        connect_args = {"connect_timeout": 2} if url.startswith("postgresql") else {}
+        self.engine = create_engine(url, future=True, pool_pre_ping=True, connect_args=connect_args)
+        self.session_factory = sessionmaker(autocommit=False, autoflush=False, bind=self.engine)
+        self.healthy = False
+        self.lag = None
+        self.checked_at = 0.0
+
+    def check(self):
+        try:
+            with self.engine.connect() as conn:
+                if self.engine.dialect.name == "postgresql":
+                    lag = conn.execute(LAG_QUERY).scalar()
+                else:
+                    conn.execute(text("SELECT 1"))
+                    lag = 0
+            if lag is None:
+                logging.warning(f"Replica {self.engine.url.host}:{self.engine.url.port} is not streaming from the primary")
+                self.lag = None
+                self.healthy = False
+            else:
+                self.lag = float(lag)
+                self.healthy = self.lag <= REPLICA_MAX_LAG_SECONDS
+        except Exception as e:
+            logging.warning(f"Replica {self.engine.url.host}:{self.engine.url.port} failed health check: {e}")
+            self.healthy = False
+            self.lag = None
+        self.checked_at = time.monotonic()
+
+
+class ReplicaRouter:
+    """Round-robin over healthy replicas, falling back to the primary.
+
+    Health checks run in a background thread; request handling only reads
+    the cached result, so a dead replica never delays a request.
+    """
+
+    def __init__(self, urls):
+        self.replicas = [Replica(url) for url in urls]
+        self._cycle = itertools.cycle(range(len(self.replicas))) if self.replicas else None
+        self._lock = threading.Lock()
+        self._monitor_pid = None
+
+    def _monitor(self):
+        while True:
+            for replica in self.replicas:
+                replica.check()
+            time.sleep(REPLICA_HEALTH_INTERVAL)
+
+    def _ensure_monitor(self):
+        # Started lazily and per process, since threads do not survive a worker fork
+        if self._monitor_pid == os.getpid():
+            return
+        with self._lock:
+            if self._monitor_pid != os.getpid():
+                self._monitor_pid = os.getpid()
+                threading.Thread(target=self._monitor, name="replica-health", daemon=True).start()
+
+    def session(self):
+        if not self.replicas:
+            return SessionLocal()
+        self._ensure_monitor()
+        for _ in range(len(self.replicas)):
+            with self._lock:
+                replica = self.replicas[next(self._cycle)]
+            if replica.healthy:
+                return replica.session_factory()
+        return SessionLocal()
+
+    def status(self) -> list:
+        self._ensure_monitor()
+        return [
+            {
+                "replica": i,
+                "healthy": r.healthy,
+                "lag_seconds": r.lag,
+                "checked_seconds_ago": round(time.monotonic() - r.checked_at, 1) if r.checked_at else None,
+            }
+            for i, r in enumerate(self.replicas)
+        ]
+
+
+replica_router = ReplicaRouter(DATABASE_REPLICA_URLS)
+_redis = redis.Redis.from_url(REDIS_URL) if DATABASE_REPLICA_URLS else None
+
+
+def _user_id(request: Request):
+    auth = request.headers.get("authorization", "")
+    if not auth.lower().startswith("bearer "):
+        return None
+    payload = decode_token(auth[7:])
+    return payload.get("sub") if payload else None
+
+
+def mark_write(request: Request):
+    """Pin the requesting user to the primary for REPLICA_STICKY_SECONDS."""
+    if _redis is None:
+        return
+    user_id = _user_id(request)
+    if user_id is None:
+        return
+    try:
+        _redis.setex(f"db:recent_write:{user_id}", REPLICA_STICKY_SECONDS, 1)
+    except redis.RedisError as e:
+        logging.warning(f"Could not record write for read-your-writes routing: {e}")
+
+
+def _recently_wrote(request: Request) -> bool:
+    user_id = _user_id(request)
+    if user_id is None:
+        return False
+    try:
+        return bool(_redis.exists(f"db:recent_write:{user_id}"))
+    except redis.RedisError:
+        # Without the marker we cannot prove the replica is fresh enough
+        return True
+
+
+def get_read_db(request: Request):
+    if _redis is None or _recently_wrote(request):
+        db = SessionLocal()
+    else:
+        db = replica_router.session()
+    try:
+        yield db
+    finally:
+        db.close()
@@ -0,0 +1,247 @@
+import csv
+import re
+
+from app.utils.blob_store import DocumentSpool
+
+# Streaming netlist import.
+# Files are read line by line and validated row by row, and each accepted row
+# goes straight to a DocumentSpool, which pages large imports into the blob
+# store as they are parsed. Memory is bounded by the set of bus ids and the
+# references still waiting for their bus, not by the size of the upload.
+# Errors carry the 1-based line number of the offending row and collection
+# stops after MAX_ERRORS.
+
+MAX_ERRORS = 100
+
+# Column layouts of the MATPOWER case format (leading columns only)
+MATPOWER_COLUMNS = {
+    "bus": ("bus_i", "type", "pd", "qd", "gs", "bs", "area", "vm", "va", "base_kv", "zone", "vmax", "vmin"),
+    "gen": ("bus", "pg", "qg", "qmax", "qmin", "vg", "mbase", "status", "pmax", "pmin"),
+    "branch": ("fbus", "tbus", "r", "x", "b", "rate_a", "rate_b", "rate_c", "ratio", "angle", "status", "angmin", "angmax"),
+}
+# Minimum number of columns a MATPOWER row must have
+MATPOWER_MIN_COLUMNS = {"bus": 13, "gen": 10, "branch": 11}
+
+# Required columns for CSV tables, keyed by table name (the upload's file stem)
+CSV_TABLES = {
+    "buses": ("id", "base_kv"),
+    "branches": ("from_bus", "to_bus", "r", "x"),
+    "generators": ("bus", "p"),
+    "loads": ("bus", "p"),
+}
+CSV_NUMERIC = {"base_kv", "r", "x", "b", "p", "q", "vm", "va", "rating", "length"}
+CSV_REFS = {"branches": ("from_bus", "to_bus"), "generators": ("bus",), "loads": ("bus",)}
+MATPOWER_SECTIONS = {"bus": "buses", "branch": "branches", "gen": "generators"}
+MATPOWER_REFS = {"branches": ("fbus", "tbus"), "generators": ("bus",)}
+
+_MATRIX_START = re.compile(r"^\s*mpc\.(\w+)\s*=\s*\[(.*)$")
+_SCALAR = re.compile(r"^\s*mpc\.(\w+)\s*=\s*([^\[;]+);")
+
+
+class NetlistImportError(Exception):
+    def __init__(self, errors):
+        self.errors = errors
+        super().__init__(f"{len(errors)} error(s) in netlist")
+
+
+class UndecodableLine(ValueError):
+    def __init__(self, line: int):
+        self.line = line
+        super().__init__(f"line {line} is not valid UTF-8 text")
+
+
+class NetlistBuilder:
+    """Streams validated rows to `spool` and defers bus references until all buses are known."""
+
+    def __init__(self, spool):
+        self.spool = spool
+        self.counts = {}
+        self.meta = {}
+        self.errors = []
+        self.lines = 0
+        self._bus_ids = set()
+        self._pending_refs = []
+
+    def error(self, line: int, message: str):
+        if len(self.errors) < MAX_ERRORS:
+            self.errors.append({"line": line, "error": message})
+
+    def add(self, table: str, line: int, row: dict, refs=()):
+        if table == "buses":
+            bus_id = row.get("id", row.get("bus_i"))
+            if bus_id in self._bus_ids:
+                self.error(line, f"duplicate bus id {bus_id}")
+                return
+            self._bus_ids.add(bus_id)
+        for key in refs:
+            if row[key] not in self._bus_ids:
+                # Bus may still appear later in the stream
+                self._pending_refs.append((line, key, row[key]))
+        if not self.errors:
+            # Once the import has failed, rows are only validated
+            self.spool.append(table, row)
+        self.counts[table] = self.counts.get(table, 0) + 1
+
+    def finish(self, fmt: str) -> dict:
+        for line, key, bus in self._pending_refs:
+            if bus not in self._bus_ids:
+                self.error(line, f"{key} references unknown bus {bus}")
+        self._pending_refs = []
+        if self.errors:
+            self.spool.discard()
+            raise NetlistImportError(self.errors)
+        return self.spool.finish({"format": fmt, **self.meta})
+
+
+def _number(value: str):
+    try:
+        return int(value)
+    except ValueError:
+        return float(value)
+
+
+def text_stream(binary):
+    """Decode an upload line by line, so bad bytes are reported with their line."""
+    for line_no, raw in enumerate(binary, start=1):
+        try:
+            # utf-8-sig drops the byte-order mark Excel writes at the start of CSVs
+            yield raw.decode("utf-8-sig" if line_no == 1 else "utf-8")
+        except UnicodeDecodeError:
+            raise UndecodableLine(line_no)
+
+
+def parse_csv_table(builder: NetlistBuilder, table: str, stream):
+    if table not in CSV_TABLES:
+        builder.error(0, f"Unknown table '{table}', expected one of {sorted(CSV_TABLES)}")
+        return
+    reader = csv.reader(stream)
+    try:
+        _parse_csv_rows(builder, table, reader)
+    except UndecodableLine as e:
+        builder.error(e.line, f"{table}: {e}")
+    except csv.Error as e:
+        builder.error(reader.line_num, f"{table}: {e}")
+
+
+def _parse_csv_rows(builder: NetlistBuilder, table: str, reader):
+    header = next(reader, None)
+    if header is None:
+        builder.error(1, f"{table}: empty file")
+        return
+    header = [h.strip().lower() for h in header]
+    missing = [c for c in CSV_TABLES[table] if c not in header]
+    if missing:
+        builder.error(1, f"{table}: missing columns {missing}")
+        return
+    refs = CSV_REFS.get(table, ())
+    for values in reader:
+        line = reader.line_num
+        builder.lines += 1
+        if not values or all(not v.strip() for v in values):
+            continue
+        if len(values) != len(header):
+            builder.error(line, f"{table}: expected {len(header)} columns, got {len(values)}")
+            continue
+        row = {}
+        try:
+            for key, value in zip(header, values):
+                value = value.strip()
+                if key in CSV_NUMERIC or key == "id" or key in refs:
+                    row[key] = _number(value) if value else None
+                else:
+                    row[key] = value
+        except ValueError:
+            builder.error(line, f"{table}: non-numeric value in row")
+            continue
+        if any(row[c] is None for c in CSV_TABLES[table]):
+            builder.error(line, f"{table}: required value missing")
+            continue
+        builder.add(table, line, row, refs)
+
+
+def parse_matpower(builder: NetlistBuilder, stream):
+    try:
+        _parse_matpower_lines(builder, stream)
+    except UndecodableLine as e:
+        builder.error(e.line, str(e))
+
+
+def _parse_matpower_lines(builder: NetlistBuilder, stream):
+    section = None
+    for line_no, raw in enumerate(stream, start=1):
+        builder.lines += 1
+        line = raw.split("%", 1)[0].strip()
+        if not line:
+            continue
+        if section is None:
+            start = _MATRIX_START.match(line)
+            if start:
+                name = start.group(1)
+                section = name if name in MATPOWER_COLUMNS else "_skip"
+                line = start.group(2).strip()
+                if not line:
+                    continue
+            else:
+                scalar = _SCALAR.match(line)
+                if scalar:
+                    key, value = scalar.group(1), scalar.group(2).strip().strip("'\"")
+                    try:
+                        builder.meta[key] = _number(value)
+                    except ValueError:
+                        builder.meta[key] = value
+                continue
+        closing = "]" in line
+        if closing:
+            line = line.split("]", 1)[0]
+        if section != "_skip":
+            for row_text in line.split(";"):
+                fields = row_text.replace(",", " ").split()
+                if fields:
+                    _matpower_row(builder, section, line_no, fields)
+        if closing:
+            section = None
+    if section is not None:
+        builder.error(builder.lines, f"Unterminated mpc.{section} matrix")
+
+
+def _matpower_row(builder: NetlistBuilder, section: str, line: int, fields: list):
+    minimum = MATPOWER_MIN_COLUMNS[section]
+    if len(fields) < minimum:
+        builder.error(line, f"mpc.{section}: expected at least {minimum} columns, got {len(fields)}")
+        return
+    try:
+        values = [_number(f) for f in fields]
+    except ValueError:
+        builder.error(line, f"mpc.{section}: non-numeric value in row")
+        return
+    columns = MATPOWER_COLUMNS[section]
+    row = dict(zip(columns, values))
+    table = MATPOWER_SECTIONS[section]
+    if table == "buses":
+        row["id"] = row.pop("bus_i")
+    builder.add(table, line, row, MATPOWER_REFS.get(table, ()))
+
+
+def import_netlist(fmt: str, files, prefix: str, store=None) -> dict:
+    """Parse `files` ((name, binary stream) pairs) into the data_json of a CircuitVersion.
+
+    Large imports are written to the blob store under `prefix` while parsing;
+    the returned document is then the pointer and summary to keep on the row.
+    """
+    if fmt == "matpower":
+        if len(files) != 1:
+            raise NetlistImportError([{"line": 0, "error": "MATPOWER import expects exactly one case file"}])
+    elif fmt != "csv":
+        raise NetlistImportError([{"line": 0, "error": f"Unsupported format '{fmt}'"}])
+    builder = NetlistBuilder(DocumentSpool(prefix, store))
+    try:
+        if fmt == "matpower":
+            parse_matpower(builder, text_stream(files[0][1]))
+        else:
+            for name, binary in files:
+                table = name.rsplit("/", 1)[-1].rsplit(".", 1)[0].lower()
+                parse_csv_table(builder, table, text_stream(binary))
+    except BaseException:
+        builder.spool.discard()
+        raise
+    return builder.finish(fmt)
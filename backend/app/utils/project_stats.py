@@ -0,0 +1,81 @@
+from datetime import datetime
+from sqlalchemy import case, func, update
+from app import models
+
+# Incremental maintenance of models.ProjectStats.
+# Counters use atomic "col = col + 1" updates and the latest-result fields are
+# only moved forward (guarded by simulation id), so concurrent writers never
+# lose updates or overwrite a newer result with an older one.
+
+Stats = models.ProjectStats
+
+def _insert_ignore(db, **values):
+    if db.bind.dialect.name == "postgresql":
+        from sqlalchemy.dialects.postgresql import insert
+    else:
+        from sqlalchemy.dialects.sqlite import insert
+    return db.execute(insert(Stats).values(**values).on_conflict_do_nothing(index_elements=["project_id"]))
+
+def _backfill_row(db, project_id: int, at: datetime) -> bool:
+    """Create the stats row counted from scratch; False if another writer created it first."""
+    # Projects created before the stats table existed are counted once. Flush
+    # first so the version/simulation being added in this session is counted.
+    db.flush()
+    versions = db.query(func.count(models.CircuitVersion.id)).filter_by(project_id=project_id).scalar()
+    sims = db.query(func.count(models.Simulation.id)).filter_by(project_id=project_id).scalar()
+    result = _insert_ignore(db, project_id=project_id, version_count=versions, simulation_count=sims, last_activity_at=at)
+    return result.rowcount == 1
+
+def _later_activity(at: datetime):
+    return case(
+        (Stats.last_activity_at.is_(None), at),
+        (Stats.last_activity_at < at, at),
+        else_=Stats.last_activity_at,
+    )
+
+def _touch(db, project_id: int, at: datetime, **increments):
+    values = {key: getattr(Stats, key) + amount for key, amount in increments.items()}
+    values["last_activity_at"] = _later_activity(at)
+    statement = update(Stats).where(Stats.project_id == project_id).values(**values)
+    if db.execute(statement).rowcount:
+        return
+    if _backfill_row(db, project_id, at):
+        return
+    # A concurrent writer created the row; its counts do not include our change
+    db.execute(statement)
+
+def init_project(db, project_id: int, at: datetime = None):
+    db.add(Stats(project_id=project_id, version_count=0, simulation_count=0, last_activity_at=at or datetime.utcnow()))
+
+def record_version(db, project_id: int, at: datetime = None):
+    _touch(db, project_id, at or datetime.utcnow(), version_count=1)
+
+def record_simulation(db, project_id: int, simulation_id: int, status: str = "pending", at: datetime = None):
+    at = at or datetime.utcnow()
+    _touch(db, project_id, at, simulation_count=1)
+    record_result(db, project_id, simulation_id, status, at)
+
+def record_result(db, project_id: int, simulation_id: int, status: str, at: datetime = None):
+    db.execute(
+        update(Stats)
+        .where(
+            Stats.project_id == project_id,
+            (Stats.latest_simulation_id.is_(None)) | (Stats.latest_simulation_id <= simulation_id),
+        )
+        .values(
+            latest_simulation_id=simulation_id,
+            latest_result_status=status,
+            last_activity_at=_later_activity(at or datetime.utcnow()),
+        )
+    )
+
+def stats_dict(stats) -> dict:
+    if stats is None:
+        return {"version_count": 0, "simulation_count": 0, "last_activity_at": None, "latest_simulation_id": None, "latest_result_status": None}
+    return {
+        "version_count": stats.version_count,
+        "simulation_count": stats.simulation_count,
+        "last_activity_at": stats.last_activity_at.isoformat() if stats.last_activity_at else None,
+        "latest_simulation_id": stats.latest_simulation_id,
+        "latest_result_status": stats.latest_result_status,
+    }
@@ -0,0 +1,205 @@
+import json
+import logging
+import math
+import os
+import time
+from datetime import datetime
+
+import redis
+
+from app import models
+
+# Tenant-aware admission control and weighted fair dispatch for simulations.
+# Each company may have at most `max_in_flight` simulations queued or running,
+# set by its license plan. Admitted jobs wait in per-company queues and are
+# handed to Celery only when a worker slot is free, picking the company with
+# the lowest virtual start time (start-time fair queuing weighted by plan), so
+# one tenant's backlog cannot starve everyone else.
+
+REDIS_URL = os.getenv("REDIS_URL", "redis://redis:6379/0")
+SCHEDULER_SLOTS = int(os.getenv("SCHEDULER_SLOTS", "4"))  # simulations dispatched to workers at once
+SCHEDULER_TASK_TIMEOUT = int(os.getenv("SCHEDULER_TASK_TIMEOUT", str(15 * 60)))  # reclaim slots of lost tasks
+DEFAULT_TASK_SECONDS = 5.0
+
+PLAN_LIMITS = {
+    "trial": {"max_in_flight": 2, "weight": 1},
+    "basic": {"max_in_flight": 5, "weight": 1},
+    "pro": {"max_in_flight": 20, "weight": 2},
+    "enterprise": {"max_in_flight": 100, "weight": 4},
+}
+DEFAULT_PLAN = "trial"
+
+
+class AdmissionError(Exception):
+    def __init__(self, retry_after: int, in_flight: int, limit: int):
+        self.retry_after = retry_after
+        self.in_flight = in_flight
+        self.limit = limit
+        super().__init__(f"{in_flight} simulations in flight, plan allows {limit}")
+
+
+def get_plan_limits(db, company_id: int) -> dict:
+    lic = (
+        db.query(models.License)
+        .filter(
+            models.License.company_id == company_id,
+            models.License.status.in_([models.LicenseStatus.active, models.LicenseStatus.trial]),
+            models.License.end_date >= datetime.utcnow(),
+        )
+        .order_by(models.License.end_date.desc())
+        .first()
+    )
+    plan = (lic.plan or "").lower() if lic else DEFAULT_PLAN
+    return {"plan": plan if plan in PLAN_LIMITS else DEFAULT_PLAN, **PLAN_LIMITS.get(plan, PLAN_LIMITS[DEFAULT_PLAN])}
+
+
+def pick_tenant(active, finish: dict, vclock: float):
+    """Return (tenant, start_tag) with the lowest virtual start time among `active`."""
+    best = None
+    for tenant in active:
+        start = max(finish.get(tenant, 0.0), vclock)
+        if best is None or (start, str(tenant)) < (best[1], str(best[0])):
+            best = (tenant, start)
+    return best
+
+
+class FairScheduler:
+    """Redis-backed admission control and fair dispatch shared by API and workers."""
+
+    def __init__(self, client, slots: int = SCHEDULER_SLOTS, prefix: str = "sched"):
+        self.client = client
+        self.slots = slots
+        self.prefix = prefix
+
+    def _key(self, *parts) -> str:
+        return ":".join([self.prefix, *map(str, parts)])
+
+    def _lock(self):
+        return self.client.lock(self._key("lock"), timeout=10, blocking_timeout=10)
+
+    def retry_after(self) -> int:
+        avg = self.client.get(self._key("avg_seconds"))
+        return max(1, math.ceil(float(avg) if avg else DEFAULT_TASK_SECONDS))
+
+    def reserve(self, company_id: int, limits: dict):
+        """Count a new simulation against the company's quota or raise AdmissionError."""
+        key = self._key("inflight", company_id)
+        with self._lock():
+            in_flight = int(self.client.get(key) or 0)
+            if in_flight >= limits["max_in_flight"]:
+                raise AdmissionError(self.retry_after(), in_flight, limits["max_in_flight"])
+            self.client.incr(key)
+
+    def enqueue(self, company_id: int, limits: dict, task_name: str, args: list, kwargs: dict, task_id: str, timeout: int = None):
+        job = {
+            "task": task_name,
+            "args": args,
+            "kwargs": {**kwargs, "company_id": company_id},
+            "task_id": task_id,
+            "timeout": timeout or SCHEDULER_TASK_TIMEOUT,
+        }
+        try:
+            with self._lock():
+                pipe = self.client.pipeline()
+                pipe.rpush(self._key("pending", company_id), json.dumps(job))
+                pipe.hset(self._key("weight"), company_id, limits["weight"])
+                pipe.sadd(self._key("active"), company_id)
+                pipe.execute()
+        except Exception:
+            # The job never reached Redis, so its reservation is given back here;
+            # once it is queued the quota is only released by its task
+            try:
+                self.cancel(company_id)
+            except Exception:
+                logging.exception(f"Could not return the reservation of company {company_id}")
+            raise
+        self._try_pump()
+
+    def _try_pump(self):
+        # A queued job is never lost when dispatch fails: the periodic pump retries it
+        try:
+            self.pump()
+        except Exception:
+            logging.exception("Dispatch failed, queued jobs wait for the next pump")
+
+    def cancel(self, company_id: int):
+        """Give back a reservation whose job was never enqueued."""
+        with self._lock():
+            self._decrement(company_id)
+
+    def release(self, company_id: int, task_id: str):
+        """Free the quota and worker slot of a dispatched task; a no-op once the task was reaped."""
+        with self._lock():
+            self._finish(company_id, task_id)
+        self._try_pump()
+
+    def _decrement(self, company_id):
+        key = self._key("inflight", company_id)
+        if int(self.client.decr(key)) < 0:
+            self.client.set(key, 0)
+
+    def _finish(self, company_id, task_id, record_duration: bool = True) -> bool:
+        running = self.client.hget(self._key("running"), task_id)
+        # Only whoever removes the task from `running` gives its quota back, so a
+        # reaped task that finishes later cannot release a newer job's quota
+        if not self.client.hdel(self._key("running"), task_id):
+            return False
+        self._decrement(company_id)
+        if record_duration:
+            duration = time.time() - json.loads(running)["started"]
+            avg = self.client.get(self._key("avg_seconds"))
+            # Exponential moving average of task duration feeds Retry-After hints
+            avg = duration if avg is None else 0.8 * float(avg) + 0.2 * duration
+            self.client.set(self._key("avg_seconds"), avg)
+        return True
+
+    def _reap(self):
+        from app.celery_worker import celery_app
+        now = time.time()
+        for task_id, running in self.client.hgetall(self._key("running")).items():
+            task_id = task_id.decode() if isinstance(task_id, bytes) else task_id
+            info = json.loads(running)
+            if now - info["started"] <= info.get("timeout", SCHEDULER_TASK_TIMEOUT):
+                continue
+            if self._finish(info["company_id"], task_id, record_duration=False):
+                logging.warning(f"Reaped task {task_id} of company {info['company_id']} after {info.get('timeout')} s")
+                # Stop it if it is still running so it no longer occupies a worker outside the slots
+                celery_app.control.revoke(task_id, terminate=True)
+
+    def pump(self):
+        """Dispatch queued jobs to Celery while worker slots are free."""
+        from app.celery_worker import celery_app
+        with self._lock():
+            self._reap()
+            while self.client.hlen(self._key("running")) < self.slots:
+                active = [int(c) for c in self.client.smembers(self._key("active"))]
+                if not active:
+                    return
+                finish = {int(c): float(v) for c, v in self.client.hgetall(self._key("finish")).items()}
+                vclock = float(self.client.get(self._key("vclock")) or 0.0)
+                company_id, start = pick_tenant(active, finish, vclock)
+                raw = self.client.lpop(self._key("pending", company_id))
+                if raw is None:
+                    self.client.srem(self._key("active"), company_id)
+                    continue
+                if not self.client.llen(self._key("pending", company_id)):
+                    self.client.srem(self._key("active"), company_id)
+                weight = float(self.client.hget(self._key("weight"), company_id) or 1)
+                self.client.set(self._key("vclock"), start)
+                self.client.hset(self._key("finish"), company_id, start + 1.0 / weight)
+                job = json.loads(raw)
+                timeout = job.get("timeout", SCHEDULER_TASK_TIMEOUT)
+                running = {"company_id": company_id, "started": time.time(), "timeout": timeout}
+                self.client.hset(self._key("running"), job["task_id"], json.dumps(running))
+                try:
+                    # The hard time limit makes prefork workers stop the task when the reaper gives up on it
+                    celery_app.send_task(job["task"], args=job["args"], kwargs=job["kwargs"], task_id=job["task_id"], time_limit=timeout)
+                except Exception:
+                    # Not dispatched: free the slot and put the job back at the head of its queue
+                    self.client.hdel(self._key("running"), job["task_id"])
+                    self.client.lpush(self._key("pending", company_id), raw)
+                    self.client.sadd(self._key("active"), company_id)
+                    raise
+
+
+scheduler = FairScheduler(redis.Redis.from_url(REDIS_URL))
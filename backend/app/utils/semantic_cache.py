@@ -0,0 +1,250 @@
+import hashlib
+import logging
+import re
+import threading
+import time
+from collections import OrderedDict
+
+import numpy as np
+
+# Semantic cache for AI assistant answers.
+# Prompts are embedded, looked up by cosine similarity in a per-namespace
+# index and evicted by LRU/TTL. As a guard on top of the embedding, numbers,
+# negations, units and direction words must match exactly for a hit, so "fault
+# current at bus 3" never answers "bus 4", "not overloaded" never answers
+# "overloaded", "in kA" never answers "in A" and "maximum" never answers
+# "minimum". HashingEmbedder is a deterministic stand-in for tests only: it
+# cannot tell opposite words apart beyond these guards.
+
+_TOKEN_RE = re.compile(r"[a-z0-9]+(?:\.[0-9]+)?")
+_NUMBER_RE = re.compile(r"\d+(?:\.\d+)?")
+_NEGATIONS = {
+    "no", "not", "never", "none", "nor", "without", "cannot", "cant", "isnt", "arent",
+    "wasnt", "werent", "dont", "doesnt", "didnt", "wont", "wouldnt", "shouldnt", "couldnt",
+}
+# Direction/extreme words; synonyms share a canonical form
+_CONTRASTS = {
+    "max": "maximum", "maximum": "maximum", "highest": "maximum", "peak": "maximum",
+    "min": "minimum", "minimum": "minimum", "lowest": "minimum",
+    "upstream": "upstream", "downstream": "downstream",
+    "raise": "increase", "increase": "increase", "higher": "increase", "up": "increase",
+    "lower": "decrease", "reduce": "decrease", "decrease": "decrease", "down": "decrease",
+    "above": "above", "over": "above", "below": "below", "under": "below",
+    "before": "before", "after": "after", "primary": "primary", "secondary": "secondary",
+    "input": "input", "output": "output", "line": "line", "phase": "phase",
+}
+# Units, case-sensitive so the unit "A" is not the article "a"
+_UNIT_RE = re.compile(r"(?<![\w.])(kA|A|mA|kV|V|MVA|kVA|VA|MW|kW|W|MVAr|kVAr|ohms?|Ω|pu|p\.u\.|Hz|%)(?![\w])")
+_STOPWORDS = {
+    "a", "an", "the", "is", "are", "was", "what", "whats", "s", "of", "on", "at",
+    "in", "for", "to", "me", "please", "can", "you", "tell", "how", "much", "do",
+    "does", "i", "my", "this", "that", "it", "be",
+}
+
+
+def normalize_prompt(text: str) -> list:
+    tokens = _TOKEN_RE.findall(text.lower().replace("'", ""))
+    return [t for t in tokens if t not in _STOPWORDS]
+
+
+def prompt_key_terms(text: str) -> frozenset:
+    """Terms that must match exactly between a prompt and a cached one."""
+    tokens = _TOKEN_RE.findall(text.lower().replace("'", ""))
+    terms = {t for t in tokens if t in _NEGATIONS}
+    terms.update("~" + _CONTRASTS[t] for t in tokens if t in _CONTRASTS)
+    terms.update("unit:" + u for u in _UNIT_RE.findall(text))
+    return frozenset(_NUMBER_RE.findall(text)) | frozenset(terms)
+
+
+class HashingEmbedder:
+    """Deterministic local embedder (hashed word unigrams + char trigrams)."""
+
+    def __init__(self, dim: int = 512):
+        self.dim = dim
+
+    def _bucket(self, feature: str) -> int:
+        digest = hashlib.md5(feature.encode()).digest()
+        return int.from_bytes(digest[:4], "little") % self.dim
+
+    def embed(self, text: str) -> np.ndarray:
+        vec = np.zeros(self.dim, dtype=np.float32)
+        tokens = normalize_prompt(text)
+        for token in tokens:
+            vec[self._bucket("w:" + token)] += 1.0
+            padded = f"#{token}#"
+            for i in range(len(padded) - 2):
+                vec[self._bucket("c:" + padded[i:i + 3])] += 0.5
+        norm = np.linalg.norm(vec)
+        return vec / norm if norm else vec
+
+
+class OpenAIEmbedder:
+    """Embedder backed by the OpenAI embeddings API."""
+
+    def __init__(self, model: str = "text-embedding-3-small"):
+        self.model = model
+
+    def embed(self, text: str) -> np.ndarray:
+        import openai
+        response = openai.Embedding.create(model=self.model, input=text)
+        vec = np.asarray(response["data"][0]["embedding"], dtype=np.float32)
+        norm = np.linalg.norm(vec)
+        return vec / norm if norm else vec
+
+
+class VectorIndex:
+    """Brute-force cosine index over unit vectors, keyed by entry id."""
+
+    def __init__(self, dim: int):
+        self.dim = dim
+        self._keys = []
+        self._pos = {}
+        self._matrix = np.zeros((0, dim), dtype=np.float32)
+
+    def __len__(self):
+        return len(self._keys)
+
+    def keys(self) -> list:
+        return list(self._keys)
+
+    def add(self, key, vector: np.ndarray):
+        if key in self._pos:
+            self._matrix[self._pos[key]] = vector
+            return
+        self._pos[key] = len(self._keys)
+        self._keys.append(key)
+        self._matrix = np.vstack([self._matrix, vector.reshape(1, -1)])
+
+    def remove(self, key):
+        idx = self._pos.pop(key, None)
+        if idx is None:
+            return
+        # Swap with the last row so removal stays O(dim)
+        last = len(self._keys) - 1
+        if idx != last:
+            last_key = self._keys[last]
+            self._keys[idx] = last_key
+            self._matrix[idx] = self._matrix[last]
+            self._pos[last_key] = idx
+        self._keys.pop()
+        self._matrix = self._matrix[:last]
+
+    def search(self, vector: np.ndarray, k: int = 5):
+        if not self._keys:
+            return []
+        scores = self._matrix @ vector
+        k = min(k, len(self._keys))
+        top = np.argpartition(-scores, k - 1)[:k]
+        top = top[np.argsort(-scores[top])]
+        return [(self._keys[i], float(scores[i])) for i in top]
+
+
+class _Entry:
+    __slots__ = ("namespace", "answer", "key_terms", "expires_at")
+
+    def __init__(self, namespace, answer, key_terms, expires_at):
+        self.namespace = namespace
+        self.answer = answer
+        self.key_terms = key_terms
+        self.expires_at = expires_at
+
+
+class SemanticCache:
+    """Semantic answer cache with LRU and TTL eviction.
+
+    Namespaces are (tenant, scope) tuples; a prompt only matches entries in
+    its own namespace and hit/miss statistics are kept per tenant.
+    `max_entries` bounds the whole cache.
+    """
+
+    def __init__(self, embedder=None, threshold: float = 0.85, max_entries: int = 1000, ttl: int = 3600):
+        self.embedder = embedder or HashingEmbedder()
+        self.threshold = threshold
+        self.max_entries = max_entries
+        self.ttl = ttl
+        self._lock = threading.Lock()
+        self._entries = OrderedDict()  # entry id -> _Entry, least recently used first
+        self._indexes = {}  # namespace -> VectorIndex
+        self._stats = {}  # tenant -> [hits, misses, lookup seconds, lookups]
+        self._next_id = 0
+
+    def _embed(self, prompt: str):
+        try:
+            return self.embedder.embed(prompt)
+        except Exception as e:
+            # A failing embedding backend only costs us the cache, never the answer
+            logging.warning(f"Semantic cache embedding failed: {e}")
+            return None
+
+    def _evict(self, key):
+        entry = self._entries.pop(key)
+        index = self._indexes[entry.namespace]
+        index.remove(key)
+        if not len(index):
+            del self._indexes[entry.namespace]
+
+    def _evict_expired(self, index, now):
+        expired = [key for key in index.keys() if self._entries[key].expires_at <= now]
+        for key in expired:
+            self._evict(key)
+
+    def get(self, namespace, prompt: str):
+        """Return (answer or None, embedding); pass the embedding on to `set` after a miss."""
+        start = time.perf_counter()
+        vector = self._embed(prompt)
+        key_terms = prompt_key_terms(prompt)
+        answer = None
+        with self._lock:
+            index = self._indexes.get(namespace)
+            if vector is not None and index is not None:
+                self._evict_expired(index, time.time())
+                for key, score in index.search(vector):
+                    if score < self.threshold:
+                        break
+                    entry = self._entries[key]
+                    if entry.key_terms == key_terms:
+                        self._entries.move_to_end(key)
+                        answer = entry.answer
+                        break
+            stats = self._stats.setdefault(namespace[0], [0, 0, 0.0, 0])
+            stats[0 if answer is not None else 1] += 1
+            stats[2] += time.perf_counter() - start
+            stats[3] += 1
+        return answer, vector
+
+    def set(self, namespace, prompt: str, answer, vector=None):
+        if vector is None:
+            vector = self._embed(prompt)
+        if vector is None:
+            return
+        with self._lock:
+            index = self._indexes.get(namespace)
+            if index is None:
+                index = self._indexes[namespace] = VectorIndex(vector.shape[0])
+            key = self._next_id
+            self._next_id += 1
+            self._entries[key] = _Entry(namespace, answer, prompt_key_terms(prompt), time.time() + self.ttl)
+            index.add(key, vector)
+            while len(self._entries) > self.max_entries:
+                self._evict(next(iter(self._entries)))
+
+    def clear(self, namespace=None):
+        with self._lock:
+            keys = [key for key, entry in self._entries.items() if namespace is None or entry.namespace == namespace]
+            for key in keys:
+                self._evict(key)
+
+    def stats(self, tenant=None) -> dict:
+        """Statistics for one tenant's namespaces."""
+        with self._lock:
+            hits, misses, seconds, lookups = self._stats.get(tenant, [0, 0, 0.0, 0])
+            total = hits + misses
+            namespaces = [ns for ns in self._indexes if ns[0] == tenant]
+            return {
+                "hits": hits,
+                "misses": misses,
+                "hit_rate": hits / total if total else 0.0,
+                "avg_lookup_ms": (seconds / lookups * 1000) if lookups else 0.0,
+                "entries": sum(len(self._indexes[ns]) for ns in namespaces),
+                "namespaces": len(namespaces),
+            }
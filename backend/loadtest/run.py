@@ -0,0 +1,295 @@
+"""End-to-end load test of the AmpFlux API against local stand-ins.
+
+Boots app.main with uvicorn on a local port (SQLite, fakeredis, thread-pool
+Celery worker, fake LLM server; see stand_ins.py) and drives it with virtual
+users running a mixed journey: login, list projects, save version, simulate,
+poll result, list simulations, AI ask. Reports p50/p95/p99 latency and
+requests per second per endpoint and compares them with a baseline recorded on
+the same machine (baselines are machine-specific and not committed).
+
+Usage:
+    pip install -r loadtest/requirements.txt
+    python -m loadtest.run --save-baseline          # record loadtest/baseline.json
+    python -m loadtest.run                          # compare with it
+"""
+import argparse
+import asyncio
+import json
+import logging
+import os
+import random
+import socket
+import statistics
+import sys
+import tempfile
+import threading
+import time
+import uuid
+from collections import defaultdict
+
+BASELINE_PATH = os.path.join(os.path.dirname(__file__), "baseline.json")
+MIN_SAMPLES = 20  # endpoints hit less often (register, create_project) are too noisy to gate on
+ERROR_SAMPLES = 3  # failing responses kept per endpoint to explain errors
+AI_PROMPTS = [
+    "What is the maximum fault current at bus {n}?",
+    "max fault current on bus {n}?",
+    "Is the cable feeding bus {n} overloaded?",
+    "Suggest a breaker rating for bus {n}.",
+]
+
+
+class Metrics:
+    def __init__(self):
+        self.latencies = defaultdict(list)
+        self.statuses = defaultdict(lambda: defaultdict(int))
+        self.error_samples = defaultdict(list)
+
+    def record(self, name: str, seconds: float, status: int, detail: str = None):
+        self.latencies[name].append(seconds)
+        self.statuses[name][status] += 1
+        if _is_error(status) and len(self.error_samples[name]) < ERROR_SAMPLES:
+            self.error_samples[name].append(f"{status} {detail or ''}".strip())
+
+    def summary(self, duration: float) -> dict:
+        report = {}
+        for name, values in sorted(self.latencies.items()):
+            values = sorted(values)
+            pick = lambda p: values[min(len(values) - 1, int(round(p / 100 * (len(values) - 1))))] * 1000
+            errors = sum(count for status, count in self.statuses[name].items() if _is_error(status))
+            report[name] = {
+                "requests": len(values),
+                "errors": errors,
+                "statuses": {str(status): count for status, count in sorted(self.statuses[name].items())},
+                "rps": round(len(values) / duration, 2),
+                "p50_ms": round(pick(50), 1),
+                "p95_ms": round(pick(95), 1),
+                "p99_ms": round(pick(99), 1),
+            }
+            if self.error_samples[name]:
+                report[name]["error_samples"] = self.error_samples[name]
+        return report
+
+
+def _is_error(status: int) -> bool:
+    return status >= 400 or status == 0
+
+
+def combine(runs: list) -> dict:
+    """Median latency/rps across runs (robust to one noisy run); summed counts."""
+    combined = {}
+    for name in sorted({name for run in runs for name in run}):
+        rows = [run[name] for run in runs if name in run]
+        statuses = defaultdict(int)
+        for row in rows:
+            for status, count in row["statuses"].items():
+                statuses[status] += count
+        combined[name] = {
+            "runs": len(rows),
+            "requests": sum(row["requests"] for row in rows),
+            "errors": sum(row["errors"] for row in rows),
+            "statuses": dict(statuses),
+            **{key: round(statistics.median(row[key] for row in rows), 2) for key in ("rps", "p50_ms", "p95_ms", "p99_ms")},
+        }
+        samples = [sample for row in rows for sample in row.get("error_samples", [])]
+        if samples:
+            combined[name]["error_samples"] = samples[:ERROR_SAMPLES]
+    return combined
+
+
+async def call(client, metrics, name, method, url, **kwargs):
+    start = time.perf_counter()
+    detail = None
+    try:
+        response = await client.request(method, url, **kwargs)
+        status = response.status_code
+        if _is_error(status):
+            detail = response.text[:200]
+    except Exception as e:
+        response, status, detail = None, 0, repr(e)[:200]
+    metrics.record(name, time.perf_counter() - start, status, detail)
+    return response
+
+
+async def virtual_user(client, metrics, args, deadline, user_no):
+    email = f"load-{user_no}-{uuid.uuid4().hex[:8]}@example.com"
+    password = "loadtest-password"
+    await call(client, metrics, "register", "POST", "/auth/register", json={"name": f"Load {user_no}", "email": email, "password": password})
+
+    async def login():
+        response = await call(client, metrics, "login", "POST", "/auth/login", json={"email": email, "password": password})
+        if response is None or response.status_code != 200:
+            return None
+        return {"Authorization": f"Bearer {response.json()['access_token']}"}
+
+    headers = await login()
+    if headers is None:
+        return
+    response = await call(client, metrics, "create_project", "POST", "/projects/", json={"name": f"Load project {user_no}"}, headers=headers)
+    if response is None or response.status_code != 200:
+        return
+    project_id = response.json()["id"]
+    rng = random.Random(user_no)
+    iteration = 0
+    while time.monotonic() < deadline:
+        iteration += 1
+        if iteration % args.login_every == 0:
+            headers = await login() or headers
+        await call(client, metrics, "list_projects", "GET", "/projects/", headers=headers)
+        resistances = [round(rng.uniform(0.1, 5), 3) for _ in range(rng.randint(2, 20))]
+        circuit = json.dumps({"voltage": 480, "resistances": resistances})
+        await call(client, metrics, "save_version", "POST", f"/circuits/{project_id}/save_version", params={"data_json": circuit}, headers=headers)
+        response = await call(client, metrics, "simulate", "POST", f"/circuits/{project_id}/simulate", json={"circuit_data": circuit}, headers=headers)
+        task_id = response.json().get("task_id") if response is not None and response.status_code == 200 else None
+        if task_id:
+            # Submit-to-result time as seen by the user; a failed or unfinished task counts as an error
+            submitted, status = time.perf_counter(), 0
+            for _ in range(args.max_polls):
+                response = await call(client, metrics, "poll_result", "GET", f"/circuits/simulation_result/{task_id}")
+                state = response.json().get("status") if response is not None and response.status_code == 200 else None
+                if state not in ("pending", "running"):
+                    status = 200 if state == "success" else 500
+                    break
+                await asyncio.sleep(args.poll_interval)
+            detail = None if status == 200 else f"task {task_id} ended as {state!r}"
+            metrics.record("simulation_e2e", time.perf_counter() - submitted, status, detail)
+        await call(client, metrics, "list_simulations", "GET", f"/circuits/{project_id}/simulations", headers=headers)
+        prompt = rng.choice(AI_PROMPTS).format(n=rng.randint(1, 5))
+        await call(client, metrics, "ai_ask", "POST", "/ai/assistant", json={"prompt": prompt, "project_id": project_id}, headers=headers)
+        if args.think:
+            await asyncio.sleep(rng.expovariate(1 / args.think))
+
+
+async def drive(base_url, args):
+    import httpx
+    metrics = Metrics()
+    limits = httpx.Limits(max_connections=args.users * 2)
+    async with httpx.AsyncClient(base_url=base_url, timeout=args.timeout, limits=limits) as client:
+        start = time.monotonic()
+        deadline = start + args.duration
+        await asyncio.gather(*(virtual_user(client, metrics, args, deadline, i) for i in range(args.users)))
+        elapsed = time.monotonic() - start
+    return metrics.summary(elapsed), elapsed
+
+
+def start_api():
+    import uvicorn
+    from app.main import app
+    with socket.socket() as sock:
+        sock.bind(("127.0.0.1", 0))
+        port = sock.getsockname()[1]
+    server = uvicorn.Server(uvicorn.Config(app, host="127.0.0.1", port=port, log_level="warning"))
+    threading.Thread(target=server.run, daemon=True).start()
+    while not server.started:
+        time.sleep(0.05)
+    return server, f"http://127.0.0.1:{port}"
+
+
+def print_report(report: dict, baseline: dict = None):
+    header = f"{'endpoint':18s} {'reqs':>7s} {'errors':>7s} {'rps':>8s} {'p50 ms':>9s} {'p95 ms':>9s} {'p99 ms':>9s}"
+    print(header + ("  vs baseline (p95, rps)" if baseline else ""))
+    for name, row in report.items():
+        line = (f"{name:18s} {row['requests']:7d} {row['errors']:7d} {row['rps']:8.2f} "
+                f"{row['p50_ms']:9.1f} {row['p95_ms']:9.1f} {row['p99_ms']:9.1f}")
+        base = (baseline or {}).get(name)
+        if base:
+            line += f"  {_delta(row['p95_ms'], base['p95_ms']):>8s} {_delta(row['rps'], base['rps']):>8s}"
+        print(line)
+    for name, row in report.items():
+        for sample in row.get("error_samples", []):
+            print(f"  {name} error: {sample}")
+
+
+def _delta(value, base):
+    return f"{(value - base) / base * 100:+.0f}%" if base else "n/a"
+
+
+def _error_rate(row: dict) -> float:
+    return row["errors"] / row["requests"] if row["requests"] else 0.0
+
+
+def regressions(report: dict, baseline: dict, tolerance: float, error_tolerance: float) -> list:
+    found = []
+    for name, base in baseline.items():
+        row = report.get(name)
+        if row is None:
+            found.append(f"{name}: missing from this run")
+            continue
+        if base["requests"] / base.get("runs", 1) < MIN_SAMPLES:
+            continue
+        if base["p95_ms"] and row["p95_ms"] > base["p95_ms"] * (1 + tolerance):
+            found.append(f"{name}: p95 {row['p95_ms']} ms vs baseline {base['p95_ms']} ms")
+        if base["rps"] and row["rps"] < base["rps"] * (1 - tolerance):
+            found.append(f"{name}: {row['rps']} rps vs baseline {base['rps']} rps")
+        if _error_rate(row) > _error_rate(base) + error_tolerance:
+            found.append(f"{name}: {_error_rate(row):.1%} errors vs baseline {_error_rate(base):.1%}")
+    return found
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--users", type=int, default=10, help="concurrent virtual users")
+    parser.add_argument("--duration", type=float, default=30, help="seconds per run")
+    parser.add_argument("--runs", type=int, default=3, help="repeated runs; latency and rps are compared as medians")
+    parser.add_argument("--think", type=float, default=0.0, help="mean think time between journeys (s)")
+    parser.add_argument("--login-every", type=int, default=5, help="re-login every N journeys")
+    parser.add_argument("--poll-interval", type=float, default=0.1)
+    parser.add_argument("--max-polls", type=int, default=50)
+    parser.add_argument("--timeout", type=float, default=30.0)
+    parser.add_argument("--llm-latency", type=float, default=0.2, help="fake LLM response delay (s)")
+    parser.add_argument("--workers", type=int, default=4, help="stand-in Celery worker threads")
+    parser.add_argument("--redis-url", default=None, help="use a real Redis instead of fakeredis")
+    parser.add_argument("--baseline", default=BASELINE_PATH)
+    parser.add_argument("--save-baseline", action="store_true")
+    parser.add_argument("--tolerance", type=float, default=0.5, help="allowed relative p95/rps regression vs baseline")
+    parser.add_argument("--error-tolerance", type=float, default=0.01, help="allowed increase of the error rate")
+    parser.add_argument("--output", default=None, help="write the report as JSON")
+    args = parser.parse_args()
+
+    sys.path.insert(0, os.path.abspath(os.path.join(os.path.dirname(__file__), "..")))
+    from loadtest import stand_ins
+
+    logging.getLogger("passlib").setLevel(logging.ERROR)
+    workdir = tempfile.mkdtemp(prefix="ampflux-loadtest-")
+    stand_ins.configure_environment(workdir, args.redis_url)
+    llm_server, llm_url = stand_ins.start_fake_llm(args.llm_latency)
+    executor = stand_ins.wire_app(llm_url, args.workers, use_fake_redis=args.redis_url is None)
+    server, base_url = start_api()
+    runs = []
+    try:
+        for run in range(args.runs):
+            report, elapsed = asyncio.run(drive(base_url, args))
+            total = sum(row["requests"] for row in report.values())
+            print(f"run {run + 1}/{args.runs}: {args.users} users, {elapsed:.1f} s, {total} requests, {total / elapsed:.1f} req/s")
+            runs.append(report)
+    finally:
+        server.should_exit = True
+        executor.shutdown(wait=False, cancel_futures=True)
+        llm_server.shutdown()
+
+    report = combine(runs)
+    baseline = None
+    if os.path.exists(args.baseline) and not args.save_baseline:
+        with open(args.baseline) as f:
+            baseline = json.load(f)["endpoints"]
+    print_report(report, baseline)
+    document = {"users": args.users, "duration": args.duration, "runs": args.runs, "endpoints": report}
+    if args.output:
+        with open(args.output, "w") as f:
+            json.dump({**document, "per_run": runs}, f, indent=2)
+    if args.save_baseline:
+        with open(args.baseline, "w") as f:
+            json.dump(document, f, indent=2)
+            f.write("\n")
+        print(f"Baseline saved to {args.baseline}")
+        return 0
+    if baseline is None:
+        print(f"No baseline at {args.baseline}; record one on this machine with --save-baseline")
+        return 0
+    found = regressions(report, baseline, args.tolerance, args.error_tolerance)
+    for problem in found:
+        print(f"REGRESSION {problem}")
+    return 1 if found else 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
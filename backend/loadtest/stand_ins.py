@@ -0,0 +1,108 @@
+"""Local stand-ins for the services app.main normally talks to.
+
+- Postgres  -> a SQLite file (tables created from the models)
+- Redis     -> an in-process fakeredis server (or a real one via --redis-url)
+- Celery    -> dispatched tasks run on a local thread pool, results kept in memory
+- OpenAI    -> a local HTTP server answering chat completions after a fixed delay
+               and embeddings (hashed, so the semantic cache path is exercised)
+
+`configure_environment` must run before anything imports `app`.
+"""
+import json
+import os
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+
+def configure_environment(workdir: str, redis_url: str = None):
+    os.environ["DATABASE_URL"] = f"sqlite:///{os.path.join(workdir, 'loadtest.db')}"
+    os.environ["BLOB_STORE_PATH"] = os.path.join(workdir, "blobs")
+    os.environ["REDIS_URL"] = redis_url or "redis://localhost:6379/15"
+    os.environ["DATABASE_REPLICA_URLS"] = ""
+    os.environ.setdefault("OPENAI_API_KEY", "loadtest")
+
+
+class _FakeLLMHandler(BaseHTTPRequestHandler):
+    latency = 0.2
+
+    def do_POST(self):
+        length = int(self.headers.get("content-length") or 0)
+        request = json.loads(self.rfile.read(length) or b"{}")
+        if self.path.endswith("/embeddings"):
+            return self._embeddings(request)
+        time.sleep(self.latency)
+        prompt = request.get("messages", [{}])[-1].get("content", "")
+        body = json.dumps({
+            "id": "chatcmpl-loadtest",
+            "object": "chat.completion",
+            "created": int(time.time()),
+            "model": request.get("model", "fake"),
+            "choices": [{
+                "index": 0,
+                "message": {"role": "assistant", "content": f"Stand-in answer ({len(prompt)} prompt chars)."},
+                "finish_reason": "stop",
+            }],
+            "usage": {"prompt_tokens": len(prompt) // 4, "completion_tokens": 8, "total_tokens": len(prompt) // 4 + 8},
+        }).encode()
+        self._send(body)
+
+    def _embeddings(self, request):
+        from app.utils.semantic_cache import HashingEmbedder
+        vector = HashingEmbedder().embed(request.get("input", ""))
+        self._send(json.dumps({
+            "object": "list",
+            "data": [{"object": "embedding", "index": 0, "embedding": vector.tolist()}],
+            "model": request.get("model", "fake"),
+            "usage": {"prompt_tokens": 0, "total_tokens": 0},
+        }).encode())
+
+    def _send(self, body: bytes):
+        self.send_response(200)
+        self.send_header("Content-Type", "application/json")
+        self.send_header("Content-Length", str(len(body)))
+        self.end_headers()
+        self.wfile.write(body)
+
+    def log_message(self, format, *args):
+        pass
+
+
+def start_fake_llm(latency: float):
+    handler = type("FakeLLMHandler", (_FakeLLMHandler,), {"latency": latency})
+    server = ThreadingHTTPServer(("127.0.0.1", 0), handler)
+    threading.Thread(target=server.serve_forever, daemon=True).start()
+    return server, f"http://127.0.0.1:{server.server_address[1]}/v1"
+
+
+def wire_app(llm_base_url: str, workers: int, use_fake_redis: bool):
+    """Point the imported app modules at the stand-ins. Returns the task executor."""
+    import openai
+    from app.database import Base, engine
+    from app.celery_worker import celery_app
+    from app.utils import ai, scheduling
+
+    engine.echo = False
+    Base.metadata.create_all(engine)
+
+    openai.api_base = llm_base_url
+
+    if use_fake_redis:
+        import fakeredis
+        client = fakeredis.FakeRedis(server=fakeredis.FakeServer())
+        ai.redis_client = client
+        scheduling.scheduler.client = client
+
+    # In-memory "broker": tasks sent by the scheduler run on local worker threads
+    celery_app.conf.result_backend = "cache+memory://"
+    celery_app.conf.task_store_eager_result = True
+    executor = ThreadPoolExecutor(max_workers=workers, thread_name_prefix="loadtest-worker")
+
+    def send_task(name, args=None, kwargs=None, task_id=None, **options):
+        task = celery_app.tasks[name]
+        executor.submit(task.apply, args=args or [], kwargs=kwargs or {}, task_id=task_id)
+
+    celery_app.send_task = send_task
+    scheduling.scheduler.slots = workers
+    return executor
@@ -0,0 +1,52 @@
+"""Add project_stats summary table
+
+Revision ID: 4f2a9c1d7e3b
+Revises: cabfb0850448
+Create Date: 2025-08-12 10:14:41.503118
+
+"""
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision: str = '4f2a9c1d7e3b'
+down_revision: Union[str, Sequence[str], None] = 'cabfb0850448'
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+def upgrade() -> None:
+    """Upgrade schema."""
+    op.create_table('project_stats',
+    sa.Column('project_id', sa.Integer(), nullable=False),
+    sa.Column('version_count', sa.Integer(), nullable=False),
+    sa.Column('simulation_count', sa.Integer(), nullable=False),
+    sa.Column('last_activity_at', sa.DateTime(), nullable=True),
+    sa.Column('latest_simulation_id', sa.Integer(), nullable=True),
+    sa.Column('latest_result_status', sa.String(), nullable=True),
+    sa.ForeignKeyConstraint(['project_id'], ['projects.id'], ),
+    sa.PrimaryKeyConstraint('project_id')
+    )
+    op.create_index(op.f('ix_projects_company_id'), 'projects', ['company_id'], unique=False)
+    # Backfill from existing versions and simulations
+    op.execute("""
+        INSERT INTO project_stats (project_id, version_count, simulation_count, last_activity_at, latest_simulation_id, latest_result_status)
+        SELECT p.id,
+               (SELECT COUNT(*) FROM circuit_versions v WHERE v.project_id = p.id),
+               (SELECT COUNT(*) FROM simulations s WHERE s.project_id = p.id),
+               GREATEST(p.created_at,
+                        (SELECT MAX(v.created_at) FROM circuit_versions v WHERE v.project_id = p.id),
+                        (SELECT MAX(s.simulated_at) FROM simulations s WHERE s.project_id = p.id)),
+               (SELECT MAX(s.id) FROM simulations s WHERE s.project_id = p.id),
+               (SELECT s.result_json->>'status' FROM simulations s WHERE s.project_id = p.id ORDER BY s.id DESC LIMIT 1)
+        FROM projects p
+    """)
+
+
+def downgrade() -> None:
+    """Downgrade schema."""
+    op.drop_index(op.f('ix_projects_company_id'), table_name='projects')
+    op.drop_table('project_stats')
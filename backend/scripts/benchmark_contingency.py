@@ -0,0 +1,53 @@
+"""Benchmark N-1 contingency throughput against the number of worker processes.
+
+Usage: python scripts/benchmark_contingency.py [buses] [--workers 1,2,4,8]
+"""
+import argparse
+import os
+import random
+import sys
+import time
+
+sys.path.append(os.path.abspath(os.path.join(os.path.dirname(__file__), "..")))
+from app.utils.contingency import NetworkModel, run_contingencies
+
+
+def generate_network(buses: int, seed: int = 1) -> dict:
+    rng = random.Random(seed)
+    bus_rows = [{"id": i + 1, "type": 3 if i == 0 else 1, "pd": rng.uniform(0, 20)} for i in range(buses)]
+    # Ring plus random chords: meshed, so most outages do not island the network
+    branches = [{"fbus": i + 1, "tbus": (i + 1) % buses + 1, "x": rng.uniform(0.01, 0.2), "rate_a": 200} for i in range(buses)]
+    for _ in range(buses // 2):
+        f, t = rng.sample(range(1, buses + 1), 2)
+        branches.append({"fbus": f, "tbus": t, "x": rng.uniform(0.01, 0.2), "rate_a": 200})
+    generators = [{"bus": 1, "pg": sum(b["pd"] for b in bus_rows)}]
+    return {"baseMVA": 100, "buses": bus_rows, "branches": branches, "generators": generators}
+
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument("buses", type=int, nargs="?", default=2000)
+    parser.add_argument("--workers", default=None, help="comma-separated worker counts")
+    args = parser.parse_args()
+    cpus = os.cpu_count() or 1
+    counts = [int(w) for w in args.workers.split(",")] if args.workers else sorted({1, 2, 4, 8, cpus} & set(range(1, cpus + 1)))
+
+    model = NetworkModel(generate_network(args.buses))
+    print(f"{args.buses} buses, {model.outage_count} outages ({len(model.gen_rows)} generators), {cpus} CPUs")
+    baseline = None
+    for workers in counts:
+        start = time.perf_counter()
+        first = None
+        done = 0
+        for chunk in run_contingencies(model, workers=workers):
+            first = first or time.perf_counter() - start
+            done += len(chunk)
+        elapsed = time.perf_counter() - start
+        rate = done / elapsed
+        baseline = baseline or rate
+        print(f"workers {workers:3d}  {elapsed:7.2f} s  {rate:9.0f} outages/s  speedup {rate / baseline:5.2f}x  "
+              f"first results after {first:5.2f} s")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,76 @@
+"""Benchmark netlist import throughput on generated MATPOWER/CSV files.
+
+Usage: python scripts/benchmark_import.py [lines] [--memory]
+"""
+import os
+import sys
+import tempfile
+import time
+import tracemalloc
+
+sys.path.append(os.path.abspath(os.path.join(os.path.dirname(__file__), "..")))
+from app.utils.blob_store import DocumentSpool, LocalBlobStore
+from app.utils.netlist_import import NetlistBuilder, parse_csv_table, parse_matpower, text_stream
+
+
+TRACE_MEMORY = "--memory" in sys.argv
+
+
+def generate_matpower(path: str, lines: int):
+    buses = lines // 2
+    with open(path, "w") as f:
+        f.write("function mpc = bench\nmpc.version = '2';\nmpc.baseMVA = 100;\nmpc.bus = [\n")
+        for i in range(1, buses + 1):
+            f.write(f"\t{i}\t1\t10.5\t2.1\t0\t0\t1\t1.0\t0\t138\t1\t1.06\t0.94;\n")
+        f.write("];\nmpc.branch = [\n")
+        for i in range(1, lines - buses + 1):
+            f.write(f"\t{i % buses + 1}\t{(i * 7) % buses + 1}\t0.01\t0.085\t0.088\t250\t250\t250\t0\t0\t1\t-360\t360;\n")
+        f.write("];\n")
+
+
+def generate_csv(path: str, lines: int):
+    with open(path, "w") as f:
+        f.write("from_bus,to_bus,r,x,b,name\n")
+        for i in range(lines):
+            f.write(f"{i % 1000},{(i * 7) % 1000},0.01,0.085,0.088,line{i}\n")
+
+
+def run(label: str, path: str, parse, blobs: str):
+    # Rows are paged to a local blob store as in the import endpoint
+    builder = NetlistBuilder(DocumentSpool(label, LocalBlobStore(blobs)))
+    if label == "csv":
+        # Reference checks need the buses table; skip them for the raw parse timing
+        builder._bus_ids = set(range(1000))
+    if TRACE_MEMORY:
+        tracemalloc.start()
+    start = time.perf_counter()
+    with open(path, "rb") as f:
+        parse(builder, text_stream(f))
+    builder.finish(label)
+    elapsed = time.perf_counter() - start
+    peak = 0
+    if TRACE_MEMORY:
+        _, peak = tracemalloc.get_traced_memory()
+        tracemalloc.stop()
+    rows = sum(builder.counts.values())
+    size = os.path.getsize(path) / 1e6
+    print(f"{label:9s} {builder.lines:>9d} lines {size:8.1f} MB {elapsed:7.2f} s "
+          f"{builder.lines / elapsed:>10.0f} lines/s {rows:>9d} rows peak {peak / 1e6:7.1f} MB "
+          f"errors {len(builder.errors)}")
+
+
+def main():
+    args = [a for a in sys.argv[1:] if not a.startswith("--")]
+    lines = int(args[0]) if args else 1_000_000
+    with tempfile.TemporaryDirectory() as tmp:
+        matpower = os.path.join(tmp, "case.m")
+        generate_matpower(matpower, lines)
+        blobs = os.path.join(tmp, "blobs")
+        run("matpower", matpower, parse_matpower, blobs)
+        branches = os.path.join(tmp, "branches.csv")
+        generate_csv(branches, lines)
+        run("csv", branches, lambda b, s: parse_csv_table(b, "branches", s), blobs)
+
+
+if __name__ == "__main__":
+    main()
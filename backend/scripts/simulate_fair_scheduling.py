@@ -0,0 +1,162 @@
+"""Discrete-event simulation of simulation-job scheduling under a noisy neighbour.
+
+One "enterprise" tenant floods the system with studies while several "basic"
+tenants submit interactive runs. Compares the old shared FIFO queue with plan
+based admission control plus weighted fair dispatch and prints queue-wait
+percentiles per tenant class. The fair run drives the real FairScheduler on an
+in-memory Redis (fakeredis, from requirements-dev.txt), with Celery dispatch
+replaced by the simulated workers.
+
+Usage: python scripts/simulate_fair_scheduling.py [--seconds 3600] [--slots 4]
+"""
+import argparse
+import heapq
+import os
+import random
+import sys
+from collections import deque
+from unittest import mock
+
+import fakeredis
+
+sys.path.append(os.path.abspath(os.path.join(os.path.dirname(__file__), "..")))
+from app.celery_worker import celery_app
+from app.utils.scheduling import AdmissionError, FairScheduler, PLAN_LIMITS
+
+TASK_NAME = "app.tasks.simulation.run_short_circuit_simulation"
+
+
+def percentile(values, p):
+    if not values:
+        return 0.0
+    values = sorted(values)
+    return values[min(len(values) - 1, int(round(p / 100 * (len(values) - 1))))]
+
+
+def arrivals(args, rng):
+    """Return time-ordered (time, tenant, plan) submissions."""
+    events = []
+    # Noisy tenant: large periodic bursts of batch studies
+    t = 0.0
+    while t < args.seconds:
+        for _ in range(args.burst):
+            events.append((t, "noisy", "enterprise"))
+        t += args.burst_interval
+    # Small tenants: Poisson interactive runs
+    for i in range(args.small_tenants):
+        t = rng.expovariate(1 / args.small_interval)
+        while t < args.seconds:
+            events.append((t, f"small-{i}", "basic"))
+            t += rng.expovariate(1 / args.small_interval)
+    events.sort()
+    return events
+
+
+class FifoQueue:
+    """The old shared queue: every job is admitted and dispatched in arrival order."""
+
+    def __init__(self, slots: int, start):
+        self.free = slots
+        self.start = start
+        self.queue = deque()
+
+    def submit(self, tenant: str, plan: str, task_id: str) -> bool:
+        self.queue.append(task_id)
+        self._dispatch()
+        return True
+
+    def complete(self, tenant: str, task_id: str):
+        self.free += 1
+        self._dispatch()
+
+    def _dispatch(self):
+        while self.free and self.queue:
+            self.free -= 1
+            self.start(self.queue.popleft())
+
+
+class SchedulerQueue:
+    """FairScheduler as used by the API and workers, on an in-memory Redis."""
+
+    def __init__(self, slots: int, start):
+        self.scheduler = FairScheduler(fakeredis.FakeRedis(), slots=slots, prefix="sim")
+        self.companies = {}
+        self.start = start
+
+    def _company(self, tenant: str) -> int:
+        return self.companies.setdefault(tenant, len(self.companies) + 1)
+
+    def submit(self, tenant: str, plan: str, task_id: str) -> bool:
+        company_id, limits = self._company(tenant), PLAN_LIMITS[plan]
+        try:
+            self.scheduler.reserve(company_id, limits)
+        except AdmissionError:
+            return False
+        self.scheduler.enqueue(company_id, limits, TASK_NAME, [], {}, task_id)
+        return True
+
+    def complete(self, tenant: str, task_id: str):
+        self.scheduler.release(self._company(tenant), task_id)
+
+
+def tenant_class(tenant: str) -> str:
+    return "noisy" if tenant == "noisy" else "small"
+
+
+def simulate(args, fair: bool, seed: int = 1):
+    rng = random.Random(seed)
+    submissions = arrivals(args, rng)
+    jobs = {}
+    waits = {"noisy": [], "small": []}
+    rejected = {"noisy": 0, "small": 0}
+    completions = []
+    now = 0.0
+
+    def start(task_id):
+        tenant, submitted = jobs[task_id]
+        waits[tenant_class(tenant)].append(now - submitted)
+        heapq.heappush(completions, (now + rng.expovariate(1 / args.service), task_id))
+
+    def send_task(name, args=None, kwargs=None, task_id=None, **options):
+        start(task_id)
+
+    queue = SchedulerQueue(args.slots, start) if fair else FifoQueue(args.slots, start)
+    i = 0
+    # Dispatch goes to the simulated workers instead of the broker
+    with mock.patch.object(celery_app, "send_task", send_task):
+        while i < len(submissions) or completions:
+            if completions and (i >= len(submissions) or completions[0][0] <= submissions[i][0]):
+                now, task_id = heapq.heappop(completions)
+                queue.complete(jobs[task_id][0], task_id)
+            else:
+                now, tenant, plan = submissions[i]
+                task_id = f"job-{i}"
+                i += 1
+                jobs[task_id] = (tenant, now)
+                if not queue.submit(tenant, plan, task_id):
+                    rejected[tenant_class(tenant)] += 1
+    return waits, rejected
+
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--seconds", type=float, default=3600)
+    parser.add_argument("--slots", type=int, default=4)
+    parser.add_argument("--service", type=float, default=2.0, help="mean task seconds")
+    parser.add_argument("--burst", type=int, default=200, help="noisy jobs per burst")
+    parser.add_argument("--burst-interval", type=float, default=60.0)
+    parser.add_argument("--small-tenants", type=int, default=5)
+    parser.add_argument("--small-interval", type=float, default=30.0, help="mean seconds between small runs")
+    args = parser.parse_args()
+
+    print(f"{'scheduler':10s} {'tenant':6s} {'jobs':>7s} {'rejected':>9s} {'p50 wait':>9s} {'p99 wait':>9s} {'max wait':>9s}")
+    for name, fair in (("fifo", False), ("fair", True)):
+        waits, rejected = simulate(args, fair)
+        for tenant in ("small", "noisy"):
+            w = waits[tenant]
+            print(f"{name:10s} {tenant:6s} {len(w):7d} {rejected[tenant]:9d} "
+                  f"{percentile(w, 50):8.1f}s {percentile(w, 99):8.1f}s {max(w, default=0):8.1f}s")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,9 @@
+import os
+import tempfile
+
+# Point the app at throwaway local services before anything imports `app`
+_workdir = tempfile.mkdtemp(prefix="ampflux-tests-")
+os.environ.setdefault("DATABASE_URL", f"sqlite:///{os.path.join(_workdir, 'test.db')}")
+os.environ.setdefault("BLOB_STORE_PATH", os.path.join(_workdir, "blobs"))
+os.environ.setdefault("REDIS_URL", "redis://localhost:6379/15")
+os.environ["DATABASE_REPLICA_URLS"] = ""
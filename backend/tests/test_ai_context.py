@@ -0,0 +1,62 @@
+import pytest
+from pydantic import ValidationError
+
+from app.routers.ai import AIRequest
+from app.utils.ai_context import build_context, dedupe_components, estimate_tokens, summarize_simulation_results
+
+
+def fault_scan(n=2000):
+    return {
+        "faults": [
+            {"bus": i, "fault_current": 1000.0 + (i * 37) % 5000, "breaker_rating": 4000, "violated": (i * 37) % 5000 > 3000}
+            for i in range(n)
+        ]
+    }
+
+
+def repr_context(components, simulation_results):
+    # How the assistant prompt was built before the token-budgeted context
+    return f"Available components: {components}\nSimulation results: {simulation_results}\n"
+
+
+def test_large_fault_scan_fits_budget():
+    results = fault_scan()
+    components = ["breaker 4000A"] * 500 + ["cable 240mm2"] * 500
+    before = estimate_tokens(repr_context(components, results))
+    context = build_context(components=components, simulation_results=results, max_tokens=500)
+    after = estimate_tokens(context)
+    assert after <= 500
+    assert after * 50 < before
+
+
+def test_summary_keeps_worst_violations():
+    summary = summarize_simulation_results(fault_scan(), top=5)["faults"]
+    assert summary["count"] == 2000
+    assert summary["violations"] > 0
+    top = summary["top_by_fault_current"]
+    assert all(item["violated"] for item in top)
+    assert top[0]["fault_current"] == max(item["fault_current"] for item in fault_scan()["faults"])
+
+
+def test_mixed_rank_types():
+    results = {"faults": [{"bus": i, "fault_current": 100.0 * i} for i in range(20)] + [{"bus": 99, "fault_current": "n/a"}]}
+    top = summarize_simulation_results(results, top=3)["faults"]["top_by_fault_current"]
+    assert [item["bus"] for item in top] == [19, 18, 17]
+
+
+def test_dedupe_components():
+    assert sorted(dedupe_components(["fuse", "fuse", "relay"])) == ["2x fuse", "relay"]
+
+
+@pytest.mark.parametrize("max_tokens", [0, 1, 2, 3])
+def test_tiny_budgets_are_respected(max_tokens):
+    context = build_context(project_context="substation upgrade", components=["fuse"],
+                            simulation_results=fault_scan(50), max_tokens=max_tokens)
+    assert estimate_tokens(context) <= max_tokens
+    if max_tokens == 0:
+        assert context == ""
+
+
+def test_context_budget_is_capped():
+    with pytest.raises(ValidationError):
+        AIRequest(prompt="worst fault?", max_context_tokens=1_000_000)
@@ -0,0 +1,61 @@
+import json
+
+import pytest
+
+from app.utils.blob_store import (
+    BLOB_THRESHOLD_BYTES, LocalBlobStore, _dumps, load_json, offload_json, read_json_range,
+)
+
+
+@pytest.fixture
+def store(tmp_path):
+    return LocalBlobStore(str(tmp_path))
+
+
+def violation(i):
+    return {"branch": i, "loading": 1.0 + i / 1000, "detail": "x" * 600}
+
+
+def test_few_large_items_are_paged(store):
+    # 900 items would stay inline with paging by item count
+    document = {"status": "ok", "violations": [violation(i) for i in range(900)]}
+    stored = offload_json("sims/1", document, store)
+    assert len(_dumps(stored)) < BLOB_THRESHOLD_BYTES
+    assert "violations" not in stored
+    assert len(stored["blob"]["fields"]["violations"]["pages"]) > 1
+    assert load_json(stored, store) == document
+
+
+def test_ranges_span_uneven_pages(store):
+    items = [violation(i) if i % 7 else {"branch": i, "detail": "y" * 20000} for i in range(900)]
+    stored = offload_json("sims/2", {"violations": items}, store)
+    pages = stored["blob"]["fields"]["violations"]["pages"]
+    assert len(set(pages)) > 1
+    for offset, limit in [(0, 10), (95, 300), (899, 5), (900, 5), (10, 0)]:
+        page = read_json_range(stored, "violations", offset, limit, store)
+        assert page["total"] == 900
+        assert page["items"] == items[offset:offset + limit]
+
+
+def test_large_dict_goes_to_one_blob(store):
+    voltages = {str(bus): {"vm": 1.0 - bus * 1e-6, "va": -0.1 * bus} for bus in range(60000)}
+    document = {"task_id": "abc", "status": "ok", "voltages": voltages, "faults": [{"bus": 1, "fault_current": 10.0}]}
+    assert len(_dumps(document)) > 8 * BLOB_THRESHOLD_BYTES
+    stored = offload_json("sims/3", document, store)
+    assert len(_dumps(stored)) < BLOB_THRESHOLD_BYTES // 4
+    assert stored["task_id"] == "abc" and stored["status"] == "ok"
+    assert stored["summary"]["voltages"] == {"type": "object", "keys": 60000}
+    assert load_json(stored, store) == document
+    assert read_json_range(stored, "faults", 0, 10, store)["items"] == document["faults"]
+
+
+def test_many_top_level_keys_stay_off_the_row(store):
+    document = {f"bus_{i}": 1.0 for i in range(40000)}
+    stored = offload_json("sims/4", document, store)
+    assert len(json.dumps(stored)) < BLOB_THRESHOLD_BYTES // 4
+    assert load_json(stored, store) == document
+
+
+def test_small_document_stays_inline(store):
+    document = {"status": "ok", "faults": [{"bus": 1}]}
+    assert offload_json("sims/5", document, store) is document
@@ -0,0 +1,135 @@
+import numpy as np
+import pytest
+
+from app import models
+from app.database import Base, SessionLocal, engine
+from app.tasks import contingency as contingency_task
+from app.utils.contingency import NetworkModel, evaluate_generator_outage, evaluate_outage, run_contingencies
+
+
+def mesh(n=12, seed=3):
+    """A ring with chords plus one radial branch, so one outage islands a bus."""
+    rng = np.random.default_rng(seed)
+    buses = [{"id": i + 1, "type": 3 if i == 0 else 1, "pd": float(rng.uniform(5, 40))} for i in range(n)]
+    branches = [{"fbus": i + 1, "tbus": (i + 1) % n + 1, "x": float(rng.uniform(0.05, 0.3)), "rate_a": 60.0} for i in range(n)]
+    branches += [{"fbus": i + 1, "tbus": (i + n // 2) % n + 1, "x": float(rng.uniform(0.1, 0.5)), "rate_a": 40.0} for i in range(0, n // 2, 2)]
+    buses.append({"id": n + 1, "type": 1, "pd": 5.0})
+    branches.append({"fbus": 2, "tbus": n + 1, "x": 0.1, "rate_a": 10.0})
+    generators = [{"bus": 1, "pg": sum(b["pd"] for b in buses)}]
+    return {"baseMVA": 100, "buses": buses, "branches": branches, "generators": generators}
+
+
+def test_outage_matches_full_resolve():
+    data = mesh()
+    model = NetworkModel(data)
+    X, flows = model.solve_base()
+    zth = np.diag(X).copy()
+    islanding = 0
+    for k in range(len(model.x)):
+        outage = evaluate_outage(k, X, model.f, model.t, model.x, model.rate, flows, zth, model.base_mva)
+        if outage["islanding"]:
+            islanding += 1
+            continue
+        reduced = NetworkModel({**data, "branches": [b for i, b in enumerate(data["branches"]) if i != k]})
+        X2, flows2 = reduced.solve_base()
+        expected = np.insert(flows2, k, 0.0)
+        post_loading = np.abs(expected) * model.base_mva / model.rate
+        assert outage["max_loading"] == pytest.approx(post_loading.max(), abs=1e-9)
+        assert outage["overload_count"] == int((post_loading > 1.0).sum())
+        weakest = int(np.argmax(np.diag(X2)))
+        assert outage["weakest_bus"] == weakest
+        assert outage["min_fault_level_pu"] == pytest.approx(1.0 / X2[weakest, weakest], rel=1e-9)
+    assert islanding == 1
+
+
+def with_generators(data):
+    """Move part of the slack generation to two other buses."""
+    moved = [{"bus": 5, "pg": 60.0}, {"bus": 9, "pg": 45.0, "status": 0}, {"bus": 8, "pg": 35.0}]
+    slack = {**data["generators"][0], "pg": data["generators"][0]["pg"] - 95.0}
+    return {**data, "generators": [slack] + moved}
+
+
+def test_generator_outage_matches_full_resolve():
+    data = with_generators(mesh())
+    model = NetworkModel(data)
+    X, flows = model.solve_base()
+    zth = np.diag(X).copy()
+    assert [model.generator_label(g)["index"] for g in range(len(model.gen_rows))] == [1, 3]
+    for g, row in enumerate(model.gen_rows):
+        outage = evaluate_generator_outage(g, X, model.f, model.t, model.x, model.rate, flows, zth,
+                                           model.gen_bus, model.gen_pg, model.base_mva)
+        # The slack takes up the lost output; its injection does not enter the DC solve
+        reduced = NetworkModel({**data, "generators": [gen for i, gen in enumerate(data["generators"]) if i != row]})
+        _, expected = reduced.solve_base()
+        post_loading = np.abs(expected) * model.base_mva / model.rate
+        assert outage["max_loading"] == pytest.approx(post_loading.max(), abs=1e-9)
+        assert outage["overload_count"] == int((post_loading > 1.0).sum())
+
+
+def test_labels_use_original_rows():
+    data = mesh()
+    # An out-of-service branch first, then a second circuit parallel to branch 3
+    data["branches"] = [{**data["branches"][0], "status": 0}] + data["branches"] + [dict(data["branches"][3])]
+    model = NetworkModel(data)
+    labels = [model.branch_label(k) for k in range(len(model.x))]
+    assert [label["index"] for label in labels] == list(range(1, len(data["branches"])))
+    parallel = [label for label in labels if (label["from_bus"], label["to_bus"]) == (4, 5)]
+    assert [label["index"] for label in parallel] == [4, len(data["branches"]) - 1]
+
+
+def test_chunks_cover_every_outage():
+    model = NetworkModel(with_generators(mesh()))
+    results = [o for chunk in run_contingencies(model, workers=1, chunk_size=4) for o in chunk]
+    assert sorted(o["branch"] for o in results if "branch" in o) == list(range(len(model.x)))
+    assert sorted(o["generator"] for o in results if "generator" in o) == list(range(len(model.gen_rows)))
+
+
+@pytest.fixture
+def simulation(monkeypatch):
+    engine.echo = False
+    Base.metadata.create_all(engine)
+    monkeypatch.setattr(contingency_task, "PROGRESS_INTERVAL", float("inf"))
+    db = SessionLocal()
+    version = models.CircuitVersion(project_id=1, data_json=mesh(40))
+    db.add(version)
+    db.flush()
+    sim = models.Simulation(project_id=1, result_json={"task_id": "t"})
+    db.add(sim)
+    db.commit()
+    ids = version.id, sim.id
+    yield ids
+    db.query(models.Simulation).delete()
+    db.query(models.CircuitVersion).delete()
+    db.query(models.ProjectStats).delete()
+    db.commit()
+    db.close()
+
+
+def stored_result(simulation_id):
+    db = SessionLocal()
+    try:
+        return db.query(models.Simulation).filter_by(id=simulation_id).one().result_json
+    finally:
+        db.close()
+
+
+def test_task_returns_top_outages_only(simulation, monkeypatch):
+    monkeypatch.setattr(contingency_task, "RESULT_TOP", 2)
+    version_id, simulation_id = simulation
+    result = contingency_task.run_contingency_analysis.apply(args=[version_id], kwargs={"simulation_id": simulation_id, "workers": 1}).get()
+    stored = stored_result(simulation_id)
+    assert result["simulation_id"] == simulation_id
+    assert stored["violating_outages"] == result["violating_outages"] > 2
+    assert len(stored["violations"]) == result["violating_outages"]
+    assert result["violations"] == stored["violations"][:2]
+
+
+def test_unexpected_failure_is_recorded(simulation, monkeypatch):
+    def fail(*args):
+        raise MemoryError()
+
+    monkeypatch.setattr(contingency_task, "_analyse", fail)
+    version_id, simulation_id = simulation
+    outcome = contingency_task.run_contingency_analysis.apply(args=[version_id], kwargs={"simulation_id": simulation_id})
+    assert outcome.failed()
+    assert stored_result(simulation_id)["status"] == "error"
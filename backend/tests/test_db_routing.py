@@ -0,0 +1,34 @@
+import pytest
+from sqlalchemy import text
+
+from app.utils import db_routing
+from app.utils.db_routing import Replica
+
+
+@pytest.fixture
+def standby(monkeypatch):
+    # A sqlite replica answering the lag query as a Postgres standby would
+    replica = Replica("sqlite://")
+    monkeypatch.setattr(replica.engine.dialect, "name", "postgresql")
+
+    def answer(lag):
+        monkeypatch.setattr(db_routing, "LAG_QUERY", text(f"SELECT {lag}"))
+        replica.check()
+        return replica
+
+    return answer
+
+
+def test_streaming_replica_within_lag_is_healthy(standby):
+    replica = standby(1.5)
+    assert replica.healthy and replica.lag == 1.5
+
+
+def test_lagging_replica_is_skipped(standby):
+    replica = standby(db_routing.REPLICA_MAX_LAG_SECONDS + 1)
+    assert not replica.healthy
+
+
+def test_disconnected_wal_receiver_is_unhealthy(standby):
+    replica = standby("NULL")
+    assert not replica.healthy and replica.lag is None
@@ -0,0 +1,139 @@
+import io
+import os
+import tracemalloc
+
+import pytest
+
+from app.utils.blob_store import BLOB_THRESHOLD_BYTES, LocalBlobStore, list_counts, load_json, read_json_range
+from app.utils.netlist_import import MAX_ERRORS, NetlistImportError, import_netlist
+
+BUSES = b"id,base_kv\n1,11\n2,11\n"
+BRANCHES = b"from_bus,to_bus,r,x\n1,2,0.01,0.1\n"
+CASE = b"""function mpc = case2
+mpc.baseMVA = 100;
+mpc.bus = [
+1 3 0 0 0 0 1 1 0 11 1 1.1 0.9;
+2 1 50 0 0 0 1 1 0 11 1 1.1 0.9;
+];
+mpc.gen = [
+1 50 0 100 -100 1 100 1 100 0;
+];
+mpc.branch = [
+1 2 0.01 0.1 0 100 100 100 0 0 1 -360 360;
+];
+"""
+
+
+def csv_import(**tables):
+    return import_netlist("csv", [(f"{name}.csv", io.BytesIO(data)) for name, data in tables.items()], "tests/import")
+
+
+def errors_of(call, *args, **kwargs):
+    with pytest.raises(NetlistImportError) as info:
+        call(*args, **kwargs)
+    return info.value.errors
+
+
+def test_csv_import():
+    data = csv_import(buses=BUSES, branches=BRANCHES)
+    assert [bus["id"] for bus in data["buses"]] == [1, 2]
+    assert data["branches"][0]["x"] == 0.1
+
+
+def test_csv_with_byte_order_mark():
+    data = csv_import(buses=b"\xef\xbb\xbf" + BUSES)
+    assert len(data["buses"]) == 2
+
+
+def test_matpower_import():
+    data = import_netlist("matpower", [("case2.m", io.BytesIO(CASE))], "tests/import")
+    assert data["baseMVA"] == 100
+    assert [len(data[t]) for t in ("buses", "generators", "branches")] == [2, 1, 1]
+
+
+def test_non_utf8_reports_line():
+    errors = errors_of(csv_import, buses=BUSES + b"3,\xff\xfe\n")
+    assert errors == [{"line": 4, "error": "buses: line 4 is not valid UTF-8 text"}]
+    errors = errors_of(import_netlist, "matpower", [("case.m", io.BytesIO(CASE.replace(b"case2", b"case\xff")))], "tests/import")
+    assert errors[0]["line"] == 1
+
+
+def test_oversized_field_reports_line():
+    errors = errors_of(csv_import, buses=BUSES + b'3,"' + b"1" * 200000 + b'"\n')
+    assert errors[0]["line"] == 4
+    assert "field larger than field limit" in errors[0]["error"]
+
+
+def test_duplicate_bus_ids():
+    errors = errors_of(csv_import, buses=BUSES + b"1,33\n")
+    assert errors == [{"line": 4, "error": "duplicate bus id 1"}]
+
+
+def test_row_errors_have_line_numbers():
+    errors = errors_of(csv_import, buses=BUSES + b"3,abc\n4\n", branches=BRANCHES + b"1,9,0.01,0.1\n")
+    assert errors == [
+        {"line": 4, "error": "buses: non-numeric value in row"},
+        {"line": 5, "error": "buses: expected 2 columns, got 1"},
+        {"line": 3, "error": "to_bus references unknown bus 9"},
+    ]
+
+
+def test_missing_columns_and_unknown_table():
+    errors = errors_of(csv_import, buses=b"id\n1\n", switches=b"id\n1\n")
+    assert [e["line"] for e in errors] == [1, 0]
+
+
+def test_unterminated_matpower_matrix():
+    errors = errors_of(import_netlist, "matpower", [("case.m", io.BytesIO(b"mpc.bus = [\n1 3 0 0 0 0 1 1 0 11 1 1.1 0.9;\n"))], "tests/import")
+    assert errors == [{"line": 2, "error": "Unterminated mpc.bus matrix"}]
+
+
+def test_error_collection_is_capped():
+    rows = b"".join(b"x,1\n" for _ in range(MAX_ERRORS * 2))
+    assert len(errors_of(csv_import, buses=b"id,base_kv\n" + rows)) == MAX_ERRORS
+
+
+def upload(header: bytes, row, count: int):
+    """A CSV upload generated line by line, so the test never holds it whole."""
+    yield header
+    for i in range(count):
+        yield row(i)
+
+
+def large_import(store, count):
+    buses = upload(b"id,base_kv\n", lambda i: b"%d,11\n" % (i + 1), 1000)
+    branches = upload(b"from_bus,to_bus,r,x,name\n",
+                      lambda i: b"%d,%d,0.01,0.085,feeder-%d\n" % (i % 1000 + 1, (i * 7) % 1000 + 1, i), count)
+    return import_netlist("csv", [("buses.csv", buses), ("branches.csv", branches)], "projects/1/versions/big", store)
+
+
+def peak_memory(call, *args):
+    tracemalloc.start()
+    try:
+        result = call(*args)
+        return result, tracemalloc.get_traced_memory()[1]
+    finally:
+        tracemalloc.stop()
+
+
+def test_large_import_is_paged_while_parsing(tmp_path):
+    store = LocalBlobStore(str(tmp_path))
+    _, small_peak = peak_memory(large_import, store, 5_000)
+    data, peak = peak_memory(large_import, store, 25_000)
+    # Five times the rows, about the same memory
+    assert peak < small_peak * 1.25
+    assert len(str(data)) < BLOB_THRESHOLD_BYTES
+    assert list_counts(data) == {"buses": 1000, "branches": 25_000}
+    page = read_json_range(data, "branches", 23_210, 2, store)["items"]
+    assert [row["name"] for row in page] == ["feeder-23210", "feeder-23211"]
+    assert len(load_json(data, store)["branches"]) == 25_000
+
+
+def test_failed_import_leaves_no_blobs(tmp_path):
+    store = LocalBlobStore(str(tmp_path))
+    bad = upload(b"from_bus,to_bus,r,x\n", lambda i: b"1,%d,0.01,0.1\n" % (2 if i < 20_000 else 5000), 20_001)
+    buses = upload(b"id,base_kv\n", lambda i: b"%d,11\n" % (i + 1), 2)
+    with pytest.raises(NetlistImportError) as info:
+        import_netlist("csv", [("buses.csv", buses), ("branches.csv", bad)], "projects/1/versions/bad", store)
+    assert info.value.errors == [{"line": 20_002, "error": "to_bus references unknown bus 5000"}]
+    assert not os.path.exists(tmp_path / "projects" / "1" / "versions" / "bad")
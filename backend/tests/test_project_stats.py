@@ -0,0 +1,55 @@
+import pytest
+
+from app import models
+from app.database import Base, SessionLocal, engine
+from app.utils import project_stats
+
+
+@pytest.fixture
+def db():
+    engine.echo = False
+    Base.metadata.create_all(engine)
+    session = SessionLocal()
+    project = models.Project(name="Legacy", company_id=1, owner_id=1)
+    session.add(project)
+    session.flush()
+    session.add(models.CircuitVersion(project_id=project.id, data_json={}))
+    session.commit()
+    session.project_id = project.id
+    yield session
+    session.rollback()
+    session.query(models.ProjectStats).delete()
+    session.query(models.CircuitVersion).delete()
+    session.query(models.Project).delete()
+    session.commit()
+    session.close()
+
+
+def stats(db, project_id):
+    db.expire_all()
+    return db.query(models.ProjectStats).filter_by(project_id=project_id).one()
+
+
+def test_backfill_counts_unflushed_version(db):
+    # Mirrors save_version: the new version is only added to the session
+    db.add(models.CircuitVersion(project_id=db.project_id, data_json={}))
+    project_stats.record_version(db, db.project_id)
+    db.commit()
+    assert stats(db, db.project_id).version_count == 2
+
+
+def test_increments_after_backfill(db):
+    for _ in range(3):
+        db.add(models.CircuitVersion(project_id=db.project_id, data_json={}))
+        project_stats.record_version(db, db.project_id)
+        db.commit()
+    assert stats(db, db.project_id).version_count == 4
+
+
+def test_backfill_yields_to_existing_row(db):
+    project_stats.init_project(db, db.project_id)
+    db.commit()
+    assert not project_stats._backfill_row(db, db.project_id, None)
+    project_stats.record_version(db, db.project_id)
+    db.commit()
+    assert stats(db, db.project_id).version_count == 1
@@ -0,0 +1,119 @@
+import json
+import time
+
+import fakeredis
+import pytest
+import redis
+
+from app.celery_worker import celery_app
+from app.utils.scheduling import AdmissionError, FairScheduler
+
+LIMITS = {"max_in_flight": 2, "weight": 1}
+
+
+@pytest.fixture
+def sched(monkeypatch):
+    sent, revoked = [], []
+    monkeypatch.setattr(celery_app, "send_task", lambda name, args, kwargs, task_id, **options: sent.append(task_id))
+    monkeypatch.setattr(celery_app.control, "revoke", lambda task_id, terminate=False: revoked.append(task_id))
+    scheduler = FairScheduler(fakeredis.FakeRedis(), slots=1)
+    scheduler.sent, scheduler.revoked = sent, revoked
+    return scheduler
+
+
+def submit(scheduler, company_id, task_id, limits=LIMITS, **kwargs):
+    scheduler.reserve(company_id, limits)
+    scheduler.enqueue(company_id, limits, "app.tasks.simulation.run_short_circuit_simulation", [], {}, task_id, **kwargs)
+
+
+def in_flight(scheduler, company_id):
+    return int(scheduler.client.get(f"sched:inflight:{company_id}") or 0)
+
+
+def test_reserve_enforces_plan_limit(sched):
+    submit(sched, 1, "a")
+    submit(sched, 1, "b")
+    with pytest.raises(AdmissionError) as info:
+        sched.reserve(1, LIMITS)
+    assert (info.value.in_flight, info.value.limit) == (2, 2)
+    sched.reserve(2, LIMITS)
+
+
+def test_cancel_returns_reservation(sched):
+    sched.reserve(1, LIMITS)
+    sched.cancel(1)
+    assert in_flight(sched, 1) == 0
+
+
+def test_release_dispatches_next_job(sched):
+    submit(sched, 1, "a")
+    submit(sched, 1, "b")
+    assert sched.sent == ["a"]
+    sched.release(1, "a")
+    assert sched.sent == ["a", "b"]
+    assert in_flight(sched, 1) == 1
+
+
+def test_dispatch_is_fair_between_companies(sched):
+    big = {"max_in_flight": 10, "weight": 1}
+    for i in range(5):
+        submit(sched, 1, f"big{i}", big)
+    submit(sched, 2, "small", big)
+    sched.release(1, "big0")
+    assert sched.sent == ["big0", "small"]
+
+
+def test_reap_reclaims_slot_once(sched):
+    submit(sched, 1, "slow", timeout=1)
+    submit(sched, 1, "next")
+    assert sched.sent == ["slow"]
+    info = json.loads(sched.client.hget("sched:running", "slow"))
+    sched.client.hset("sched:running", "slow", json.dumps({**info, "started": time.time() - 10}))
+    sched.pump()
+    assert sched.revoked == ["slow"]
+    assert sched.sent == ["slow", "next"]
+    assert in_flight(sched, 1) == 1
+    # The reaped task finishing late must not release the newer job's quota
+    sched.release(1, "slow")
+    assert in_flight(sched, 1) == 1
+    sched.release(1, "next")
+    assert in_flight(sched, 1) == 0
+
+
+def test_enqueue_that_never_reaches_redis_returns_reservation(sched, monkeypatch):
+    sched.reserve(1, LIMITS)
+
+    def broken_pipeline(*args, **kwargs):
+        raise redis.ConnectionError("connection reset")
+
+    monkeypatch.setattr(sched.client, "pipeline", broken_pipeline)
+    with pytest.raises(redis.ConnectionError):
+        sched.enqueue(1, LIMITS, "app.tasks.simulation.run_short_circuit_simulation", [], {}, "lost")
+    assert in_flight(sched, 1) == 0
+
+
+def test_failed_dispatch_keeps_job_queued(sched, monkeypatch):
+    def broker_down(name, args, kwargs, task_id, **options):
+        raise ConnectionError("broker unavailable")
+
+    monkeypatch.setattr(celery_app, "send_task", broker_down)
+    submit(sched, 1, "a")
+    # Queued, so the quota stays reserved and no slot is held
+    assert in_flight(sched, 1) == 1
+    assert sched.client.hlen("sched:running") == 0
+    assert sched.client.llen("sched:pending:1") == 1
+    monkeypatch.setattr(celery_app, "send_task", lambda name, args, kwargs, task_id, **options: sched.sent.append(task_id))
+    sched.pump()
+    assert sched.sent == ["a"]
+    sched.release(1, "a")
+    assert in_flight(sched, 1) == 0
+
+
+def test_dispatch_follows_plan_weights(sched):
+    for i in range(6):
+        submit(sched, 1, f"pro{i}", {"max_in_flight": 10, "weight": 2})
+        submit(sched, 2, f"basic{i}", {"max_in_flight": 10, "weight": 1})
+    for _ in range(5):
+        running = sched.sent[-1]
+        sched.release(1 if running.startswith("pro") else 2, running)
+    assert sum(task_id.startswith("pro") for task_id in sched.sent) == 4
@@ -0,0 +1,127 @@
+import fakeredis
+import pytest
+
+from app.utils import ai
+from app.utils.ai_context import build_context
+from app.utils.semantic_cache import HashingEmbedder, SemanticCache, prompt_key_terms
+
+NS = (1, "scope")
+
+
+def make_cache(embedder=None, **kwargs):
+    # The hashing embedder is the deterministic test stand-in for a real model
+    return SemanticCache(embedder=embedder or HashingEmbedder(), threshold=0.85, **kwargs)
+
+
+def lookup(cache, namespace, prompt):
+    return cache.get(namespace, prompt)[0]
+
+
+def test_reworded_question_hits():
+    cache = make_cache()
+    cache.set(NS, "What is the maximum fault current at bus 3?", "12 kA")
+    assert lookup(cache, NS, "Tell me the maximum fault current on bus 3") == "12 kA"
+    assert cache.stats(1)["hits"] == 1
+
+
+def test_numbers_must_match():
+    cache = make_cache()
+    cache.set(NS, "What is the maximum fault current at bus 3?", "12 kA")
+    assert lookup(cache, NS, "What is the maximum fault current at bus 4?") is None
+
+
+def test_negation_must_match():
+    cache = make_cache()
+    cache.set(NS, "is bus 3 overloaded?", "yes")
+    assert lookup(cache, NS, "is bus 3 not overloaded?") is None
+    assert prompt_key_terms("isn't bus 3 overloaded") == frozenset({"3", "isnt"})
+
+
+def test_namespaces_and_stats_are_isolated():
+    cache = make_cache()
+    cache.set((1, "a"), "worst fault current?", "answer for company 1")
+    assert lookup(cache, (2, "a"), "worst fault current?") is None
+    assert lookup(cache, (1, "b"), "worst fault current?") is None
+    stats = cache.stats(1)
+    assert (stats["entries"], stats["namespaces"], stats["misses"]) == (1, 1, 1)
+    assert cache.stats(2)["entries"] == 0
+
+
+def test_lru_bound_is_global():
+    cache = make_cache(max_entries=2)
+    for company in range(3):
+        cache.set((company, "s"), "worst fault current?", company)
+    assert lookup(cache, (0, "s"), "worst fault current?") is None
+    assert lookup(cache, (2, "s"), "worst fault current?") == 2
+
+
+def test_embedding_failure_is_a_miss():
+    class Broken:
+        def embed(self, text):
+            raise RuntimeError("embedding API down")
+
+    cache = make_cache(embedder=Broken())
+    cache.set(NS, "worst fault current?", "12 kA")
+    assert lookup(cache, NS, "worst fault current?") is None
+    assert cache.stats(1)["misses"] == 1
+
+
+@pytest.mark.parametrize("cached, asked", [
+    ("What is the maximum three-phase fault current at bus 3?", "What is the minimum three-phase fault current at bus 3?"),
+    ("Which upstream breaker trips first at bus 3?", "Which downstream breaker trips first at bus 3?"),
+    ("Which relay settings should I raise at bus 3?", "Which relay settings should I lower at bus 3?"),
+    ("What is the fault current at bus 3 in kA?", "What is the fault current at bus 3 in A?"),
+])
+def test_opposite_words_and_units_must_match(cached, asked):
+    cache = make_cache()
+    cache.set(NS, cached, "cached answer")
+    assert lookup(cache, NS, asked) is None
+
+
+def test_synonyms_share_a_key_term():
+    assert prompt_key_terms("max fault current at bus 3") == prompt_key_terms("maximum fault current at bus 3")
+
+
+def test_miss_embeds_once():
+    class Counting(HashingEmbedder):
+        calls = 0
+
+        def embed(self, text):
+            Counting.calls += 1
+            return super().embed(text)
+
+    cache = make_cache(embedder=Counting())
+    answer, vector = cache.get(NS, "worst fault current?")
+    cache.set(NS, "worst fault current?", "12 kA", vector)
+    assert answer is None and Counting.calls == 1
+
+
+@pytest.fixture
+def fake_llm(monkeypatch):
+    calls = []
+
+    def create(model, messages, max_tokens):
+        calls.append(messages[-1]["content"])
+        return type("R", (), {"choices": [type("C", (), {"message": type("M", (), {"content": f"answer {len(calls)}"})})]})
+
+    monkeypatch.setattr(ai, "redis_client", fakeredis.FakeRedis())
+    monkeypatch.setattr(ai, "semantic_cache", make_cache())
+    monkeypatch.setattr(ai.openai.ChatCompletion, "create", create)
+    return calls
+
+
+def test_large_context_does_not_make_questions_match(fake_llm):
+    results = {"faults": [{"bus": i, "fault_current": 1000.0 + i} for i in range(2000)]}
+    context = build_context(None, None, results, None)
+    first = ai.ask_gpt("What is the worst fault current?", company_id=1, context=context)
+    second = ai.ask_gpt("Which breaker should I size up and why?", company_id=1, context=context)
+    assert first != second
+    assert len(fake_llm) == 2
+    assert fake_llm[0].startswith(context)
+
+
+def test_same_question_other_context_misses(fake_llm):
+    ai.ask_gpt("What is the worst fault current?", company_id=1, context="Project: A\n")
+    ai.ask_gpt("what's the worst fault current", company_id=1, context="Project: B\n")
+    ai.ask_gpt("what's the worst fault current", company_id=1, context="Project: A\n")
+    assert len(fake_llm) == 2